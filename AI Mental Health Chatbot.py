@@ -1,7 +1,10 @@
 # AI Mental Health Chatbot - single Jupyter cell
 # No external APIs required. Uses ipywidgets for UI (fall back to CLI).
-import re, datetime, json, os
-from IPython.display import display, HTML, clear_output
+import re, sys, csv, html, time, random, atexit, asyncio, argparse, datetime, itertools, json, os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import namedtuple, deque, Counter
+from functools import lru_cache
+from IPython.display import display, HTML
 
 # Try import widgets
 try:
@@ -28,36 +31,121 @@ THEME_KEYWORDS = {
 def clean_words(text):
     return re.findall(r"\b[a-z']+\b", text.lower())
 
-def sentiment_score(text):
-    words = clean_words(text)
-    if not words:
+WORD_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz'")
+THEME_SUFFIXES = ("", "s", "es", "ed", "ing", "ness", "er", "ers")  # "exams", "working", "illness" still count
+_NORMALIZE = str.maketrans({"\u2019": "'", "\u2018": "'", "\u02bc": "'", "\u2010": "-", "\u2011": "-"})
+
+def normalize_text(text):
+    # lower-case, straight apostrophes/hyphens, single spaces
+    return " ".join(text.lower().translate(_NORMALIZE).split())
+
+ScanResult = namedtuple("ScanResult", "crisis themes pos neg words")
+
+class MessageScanner:
+    """
+    One Aho-Corasick automaton over crisis phrases and theme keywords, plus word-level
+    lexicon lookups, so a message is read once. Boundaries per pattern kind:
+      - crisis phrases match anywhere (same recall as the old substring check)
+      - theme keywords must start a word and may end in a short suffix (no "ill" in "will")
+      - positive/negative lexicon entries are whole clean_words() tokens of the raw text
+    """
+    def __init__(self, crisis, themes, pos_words, neg_words):
+        self.theme_names = list(themes)
+        self.pos, self.neg = frozenset(pos_words), frozenset(neg_words)
+        goto, out = [{}], [[]]
+        def add(phrase, tag):
+            st = 0
+            for ch in normalize_text(phrase):
+                nxt = goto[st].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[st][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                st = nxt
+            out[st].append(tag)
+        for phrase in crisis:
+            add(phrase, (0, phrase, len(normalize_text(phrase))))
+        for t, name in enumerate(self.theme_names):
+            for kw in themes[name]:
+                add(kw, (1, t, len(normalize_text(kw))))
+        # failure links (BFS); each state inherits its suffix state's outputs
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for st in queue:
+            for ch, nxt in goto[st].items():
+                f = fail[st]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f][ch] if ch in goto[f] and goto[f][ch] != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+                queue.append(nxt)
+        self.goto, self.fail, self.out = goto, fail, [tuple(o) for o in out]
+        self.patterns = sum(len(v) for v in themes.values()) + len(crisis)
+
+    def scan(self, text):
+        t = normalize_text(text) + " "  # trailing space closes the last word
+        goto, fail, out = self.goto, self.fail, self.out
+        crisis, themes = [], set()
+        st = 0
+        n = len(t) - 1
+        for i, ch in enumerate(t):
+            while st and ch not in goto[st]:
+                st = fail[st]
+            st = goto[st].get(ch, 0)
+            if not out[st]:
+                continue
+            for kind, val, length in out[st]:
+                if kind == 0:
+                    crisis.append(val)
+                elif val not in themes:
+                    start = i - length + 1
+                    if start and t[start - 1] in WORD_CHARS:
+                        continue
+                    j = i + 1
+                    while j < n and t[j] in WORD_CHARS and j - i <= 4:
+                        j += 1
+                    if t[i + 1:j] in THEME_SUFFIXES and t[j] not in WORD_CHARS:
+                        themes.add(val)
+        # sentiment keeps clean_words() tokens on the raw text so scores (and moods) don't shift
+        words = clean_words(text)
+        pos = sum(1 for w in words if w in self.pos)
+        neg = sum(1 for w in words if w in self.neg)
+        return ScanResult(tuple(crisis), [self.theme_names[k] for k in sorted(themes)], pos, neg, len(words))
+
+SCANNER = MessageScanner(CRISIS_KEYWORDS, THEME_KEYWORDS, POS_WORDS, NEG_WORDS)
+
+def rebuild_scanner():
+    """Call after editing the lexicons above."""
+    global SCANNER
+    SCANNER = MessageScanner(CRISIS_KEYWORDS, THEME_KEYWORDS, POS_WORDS, NEG_WORDS)
+    scan_message.cache_clear()
+    return SCANNER
+
+@lru_cache(maxsize=4096)
+def scan_message(text):
+    # the UI scores the same message several times; cache the single pass
+    return SCANNER.scan(text)
+
+def sentiment_from_scan(r):
+    if not r.words:
         return 0.0
-    pos = sum(1 for w in words if w in POS_WORDS)
-    neg = sum(1 for w in words if w in NEG_WORDS)
-    score = (pos - neg) / max(1, len(words))
-    return round(score, 3)
+    return round((r.pos - r.neg) / max(1, r.words), 3)
+
+def sentiment_score(text):
+    return sentiment_from_scan(scan_message(text))
 
 def detect_crisis(text):
-    t = text.lower()
-    for kw in CRISIS_KEYWORDS:
-        if kw in t:
-            return True
-    return False
+    return bool(scan_message(text).crisis)
 
 def detect_themes(text):
-    t = text.lower()
-    hits = []
-    for theme, kws in THEME_KEYWORDS.items():
-        for k in kws:
-            if k in t:
-                hits.append(theme)
-                break
-    return hits
+    return list(scan_message(text).themes)
 
 # --- Response generator ---
 def generate_response(user_text):
+    scan = scan_message(user_text)
     # immediate crisis check
-    if detect_crisis(user_text):
+    if scan.crisis:
         resp = (
             "I'm really sorry you're feeling this way. If you're in immediate danger, "
             "please call your local emergency number or contact a crisis hotline right now. "
@@ -68,8 +156,8 @@ def generate_response(user_text):
         return resp, flagged
 
     # sentiment & theme
-    s = sentiment_score(user_text)
-    themes = detect_themes(user_text)
+    s = sentiment_from_scan(scan)
+    themes = scan.themes
 
     # Empathetic reflection
     if s <= -0.03:
@@ -122,6 +210,8 @@ def coping_tips_html():
     html += "</ul>"
     return html
 
+COPING_TIPS_HTML = coping_tips_html()
+
 def breathing_html():
     html = """
     <div style='font-family:Arial; max-width:600px;'>
@@ -136,6 +226,8 @@ def breathing_html():
     """
     return html
 
+BREATHING_HTML = breathing_html()
+
 # --- Chat handling ---
 chat_log = []  # list of dicts: {'who':'user'/'bot','text':..., 'ts':...,'sent':score}
 mood_history = []  # list of numeric mood scores (0-10)
@@ -145,9 +237,41 @@ def mood_from_sentiment(s):
     val = int(round((s + 0.5) * 10))
     return max(0, min(10, val))
 
-def render_chat_html():
-    # build chat bubbles
-    html = """
+class MoodStats:
+    """Running mood summary: every update and read is O(1), whatever the history length."""
+    def __init__(self, window=7):
+        self.recent = deque(maxlen=window)
+        self.recent_sum = 0
+        self.count = 0
+        self.total = 0
+        self.last = self.low = self.high = None
+
+    def add(self, value):
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_sum -= self.recent[0]
+        self.recent.append(value)
+        self.recent_sum += value
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.low = value if self.low is None else min(self.low, value)
+        self.high = value if self.high is None else max(self.high, value)
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 1) if self.count else None
+
+    @property
+    def recent_average(self):
+        return round(self.recent_sum / len(self.recent), 1) if self.recent else None
+
+mood_stats = MoodStats()
+
+def record_mood(value):
+    mood_history.append(value)
+    mood_stats.add(value)
+
+CHAT_STYLE = """
     <style>
       .chat-card { max-width:760px; font-family:Arial; margin:6px; }
       .bubble { padding:10px 14px; border-radius:14px; margin:8px 0; display:inline-block; max-width:78%; }
@@ -158,26 +282,233 @@ def render_chat_html():
       .header { background:linear-gradient(90deg,#6078ff,#00c6ff); color:white; padding:12px; border-radius:10px; margin-bottom:8px; }
       .small { font-size:13px; color:#333; }
     </style>
-    <div class='chat-card'>
-      <div class='header'><b>AI Mental Wellness Assistant</b> — supportive, non-clinical help</div>
-    """
-    for item in chat_log[-30:]:
+"""
+CHAT_HEADER = "<div class='header'><b>AI Mental Wellness Assistant</b> — supportive, non-clinical help</div>"
+
+def bubble_html(item):
+    # rendered once per message and kept on the item
+    cached = item.get('html')
+    if cached is None:
         ts = item['ts'].strftime("%H:%M")
-        if item['who']=='user':
-            html += f"<div class='bubble user'><div class='small'>{item['text']}</div><div class='meta'>{ts} • You</div></div><div class='clear'></div>"
-        else:
-            html += f"<div class='bubble bot'><div class='small'>{item['text']}</div><div class='meta'>{ts} • Assistant</div></div><div class='clear'></div>"
-    # mood summary
-    if mood_history:
-        avg_mood = round(sum(mood_history)/len(mood_history),1)
-        html += f"<div style='margin-top:10px; padding:10px; border-radius:8px; background:#f0f4f8;'><b>Mood summary</b>: last={mood_history[-1]}, avg={avg_mood} (0 low — 10 high)</div>"
+        who, label = ('user', 'You') if item['who']=='user' else ('bot', 'Assistant')
+        cached = item['html'] = (f"<div class='bubble {who}'><div class='small'>{html.escape(item['text'])}</div>"
+                                 f"<div class='meta'>{ts} • {label}</div></div><div class='clear'></div>")
+    return cached
+
+def mood_summary_html(stats=None):
+    stats = stats or mood_stats
+    if stats.count:
+        body = (f"last={stats.last}, avg={stats.average}, recent avg={stats.recent_average} (last {len(stats.recent)}), "
+                f"range {stats.low}–{stats.high} (0 low — 10 high)")
     else:
-        html += f"<div style='margin-top:10px; padding:10px; border-radius:8px; background:#f0f4f8;'><b>Mood summary</b>: no entries yet</div>"
-    html += "</div>"
-    return html
+        body = "no entries yet"
+    return f"<div style='margin-top:10px; padding:10px; border-radius:8px; background:#f0f4f8;'><b>Mood summary</b>: {body}</div>"
+
+def render_chat_html():
+    # full page (last 30 bubbles + mood summary), built from the cached fragments
+    bubbles = "".join(bubble_html(item) for item in chat_log[-30:])
+    return f"{CHAT_STYLE}<div class='chat-card'>{CHAT_HEADER}{bubbles}{mood_summary_html()}</div>"
+
+class ChatView:
+    """
+    Append-only chat for an ipywidgets Output: the stylesheet and header are shown once,
+    each message is appended as its own output, and the mood summary lives in a separate
+    HTML widget that is updated in place. Past `window` messages the oldest outputs are
+    dropped in batches (chat_log keeps everything).
+    """
+    def __init__(self, output, mood_box, window=30):
+        self.output = output
+        self.mood_box = mood_box
+        self.window = window
+        self.output.outputs = ()
+        self.output.append_display_data(HTML(CHAT_STYLE + f"<div class='chat-card'>{CHAT_HEADER}</div>"))
+        for item in chat_log[-window:]:
+            self.append(item)
+        self.update_mood()
+
+    def append(self, item):
+        self.show(f"<div class='chat-card'>{bubble_html(item)}</div>")
+
+    def show(self, fragment):
+        self.output.append_display_data(HTML(fragment))
+        outputs = self.output.outputs
+        # header + window outputs, trimmed in steps so the list is only resent occasionally
+        if len(outputs) > 1 + self.window + max(1, self.window // 4):
+            self.output.outputs = (outputs[0],) + tuple(outputs[-self.window:])
+
+    def update_mood(self):
+        self.mood_box.value = mood_summary_html()
+
+# --- Session journal (append-only JSONL + daily mood aggregates) ---
+JOURNAL_PATH = os.environ.get("WELLNESS_JOURNAL", "wellness_journal.jsonl")
+
+class MoodJournal:
+    """
+    Every message (text, sentiment, mood) is appended to a JSONL file as it happens;
+    writes are fsynced in batches (every `fsync_every` lines or `fsync_interval` s).
+    A sidecar <path>.agg.json holds per-day mood aggregates [count, sum, min, max],
+    the last few moods and the journal byte offset they cover, so loading history
+    only replays lines written after the last sync.
+    With readonly=True nothing is repaired, created or written, so reports can read
+    a journal that a live session is still appending to.
+    """
+    def __init__(self, path=JOURNAL_PATH, fsync_every=32, fsync_interval=2.0, recent=7, readonly=False):
+        self.path = path
+        self.agg_path = path + ".agg.json"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.daily = {}
+        self.recent = deque(maxlen=recent)
+        self.offset = 0
+        self.readonly = readonly
+        if not readonly:
+            self._repair_tail()
+        self._load_aggregates()
+        self.f = None if readonly else open(path, "ab")
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def _repair_tail(self, block=65536):
+        # a crash mid-write can leave half a line; cut back to the last newline,
+        # reading backwards in blocks so a long torn line can't wipe the file
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            end = size
+            while end > 0:
+                start = max(0, end - block)
+                f.seek(start)
+                cut = f.read(end - start).rfind(b"\n")
+                if cut >= 0:
+                    f.truncate(start + cut + 1)
+                    return
+                end = start
+            f.truncate(0)  # a single torn line and nothing before it
+
+    def _load_aggregates(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.bad_lines = 0
+        try:
+            with open(self.agg_path, encoding="utf-8") as f:
+                agg = json.load(f)
+            if agg["journal_offset"] <= size:
+                self.daily = agg["daily"]
+                self.recent.extend(agg["recent"])
+                self.offset = agg["journal_offset"]
+        except (OSError, ValueError, KeyError):
+            pass  # no/unreadable sidecar: rebuild from the start of the journal
+        if self.offset < size:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # read-only view of a line still being written
+                    self.offset += len(line)
+                    try:
+                        self._count(json.loads(line))
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        self.bad_lines += 1  # corrupt line: skip it, keep the rest
+
+    def _count(self, entry):
+        mood = entry.get("mood")
+        if mood is None:
+            return
+        day = entry["ts"][:10]
+        d = self.daily.get(day)
+        if d is None:
+            self.daily[day] = [1, mood, mood, mood]
+        else:
+            d[0] += 1
+            d[1] += mood
+            d[2] = min(d[2], mood)
+            d[3] = max(d[3], mood)
+        self.recent.append(mood)
+
+    def append(self, item, mood=None):
+        if self.readonly:
+            raise ValueError(f"{self.path} was opened read-only")
+        entry = {"ts": item["ts"].isoformat(), "who": item["who"], "text": item["text"],
+                 "sent": item.get("sent", 0.0), "mood": mood}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        self.f.write(line)
+        self.offset += len(line)
+        self._count(entry)
+        self.pending += 1
+        if self.pending >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """fsync the journal, then record the aggregates up to that point."""
+        if self.f is None or self.f.closed:
+            return
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        tmp = self.agg_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"journal_offset": self.offset, "daily": self.daily, "recent": list(self.recent)}, f)
+        os.replace(tmp, self.agg_path)
+
+    def close(self):
+        if self.f is not None and not self.f.closed:
+            self.sync()
+            self.f.close()
+
+    def mood_stats(self):
+        """A MoodStats seeded from the aggregates (no journal replay)."""
+        stats = MoodStats(self.recent.maxlen)
+        for value in self.recent:
+            stats.add(value)
+        if self.daily:
+            days = self.daily.values()
+            stats.count = sum(d[0] for d in days)
+            stats.total = sum(d[1] for d in days)
+            stats.low = min(d[2] for d in days)
+            stats.high = max(d[3] for d in days)
+        return stats
+
+    def series(self, period="day"):
+        """[(label, count, avg, min, max)] per day or ISO week, oldest first."""
+        buckets = {}
+        for day, (n, total, lo, hi) in sorted(self.daily.items()):
+            if period == "week":
+                y, w, _ = datetime.date.fromisoformat(day).isocalendar()
+                day = f"{y}-W{w:02d}"
+            b = buckets.setdefault(day, [0, 0, lo, hi])
+            b[0] += n
+            b[1] += total
+            b[2] = min(b[2], lo)
+            b[3] = max(b[3], hi)
+        return [(k, n, round(t / n, 2), lo, hi) for k, (n, t, lo, hi) in buckets.items()]
+
+journal = None  # MoodJournal once a UI session starts
+
+def open_journal(path=JOURNAL_PATH):
+    """Open the journal and restore the mood summary from its aggregates."""
+    global journal, mood_stats
+    journal = MoodJournal(path)
+    mood_stats = journal.mood_stats()
+    atexit.register(journal.close)
+    return journal
+
+def log_message(item, mood=None):
+    chat_log.append(item)
+    if journal is not None:
+        journal.append(item, mood)
 
 # --- Save transcript ---
 def save_transcript():
+    """Flush the journal to disk and return its path (or write a text export when no journal is open)."""
+    if journal is not None:
+        journal.sync()
+        return os.path.abspath(journal.path)
     if not chat_log:
         return None
     ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -189,25 +520,513 @@ def save_transcript():
             f.write(f"[{item['ts'].isoformat()}] {who}: {item['text']}\n")
     return path
 
-# --- UI (widgets) ---
-if HAS_WIDGETS:
+def export_journal_text(journal_path, out_path):
+    """Stream a journal into a readable text transcript; returns (out_path, skipped corrupt lines)."""
+    bad_lines = 0
+    with open(journal_path, encoding="utf-8", errors="replace") as src, open(out_path, "w", encoding="utf-8") as out:
+        for line in src:
+            try:
+                e = json.loads(line)
+                who = "You" if e["who"] == "user" else "Assistant"
+                out.write(f"[{e['ts']}] {who}: {e['text']}\n")
+            except (ValueError, KeyError, TypeError):
+                bad_lines += 1  # torn or corrupt line, as in MoodJournal replay
+    return out_path, bad_lines
+
+def benchmark_journal(path, messages=200_000, days=365, seed=2):
+    """Append rate, then summary load from aggregates vs replaying the whole journal."""
+    rng = random.Random(seed)
+    for p in (path, path + ".agg.json"):
+        if os.path.exists(p):
+            os.remove(p)
+    j = MoodJournal(path)
+    start = datetime.datetime(2024, 1, 1)
+    t = time.perf_counter()
+    for i in range(messages):
+        ts = start + datetime.timedelta(seconds=i * days * 86400 / messages)
+        j.append({"who": "user", "text": "feeling okay today", "ts": ts, "sent": 0.0}, rng.randint(0, 10))
+    j.close()
+    append_s = time.perf_counter() - t
+    t = time.perf_counter()
+    stats = MoodJournal(path).mood_stats()
+    load_ms = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    replay = MoodStats()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            replay.add(json.loads(line)["mood"])
+    replay_ms = (time.perf_counter() - t) * 1000
+    assert (stats.count, stats.total, stats.low, stats.high, stats.recent_average) == \
+           (replay.count, replay.total, replay.low, replay.high, replay.recent_average)
+    return {"messages": messages, "appends_per_sec": round(messages / append_s),
+            "summary_load_ms": round(load_ms, 2), "full_replay_ms": round(replay_ms, 1)}
+
+# --- Scanner microbenchmark ---
+def _substring_scan(text, crisis, themes, pos_words, neg_words):
+    # the previous three-pass approach, kept only as the benchmark baseline
+    t = text.lower()
+    flagged = any(kw in t for kw in crisis)
+    hits = [theme for theme, kws in themes.items() if any(k in t for k in kws)]
+    words = clean_words(text)
+    pos = sum(1 for w in words if w in pos_words)
+    neg = sum(1 for w in words if w in neg_words)
+    return flagged, hits, pos, neg
+
+def benchmark_scanner(sizes=(10, 100, 1000, 5000), messages=2000, seed=1):
+    """Per-message latency (µs) of the substring passes vs MessageScanner as lexicons grow."""
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ren", "tas", "vo", "qui", "del", "sar", "ny"]
+    fake = lambda k: " ".join("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(k))
+    base = ["I feel anxious about work and my exams", "Had a calm and good day with my partner",
+            "I can't sleep and I'm so tired and stressed", "I don't know, things are okay I guess",
+            "Everything hurts and I feel hopeless lately"]
+    texts = [rng.choice(base) + " " + fake(rng.randint(0, 6)) for _ in range(messages)]
+    report = []
+    for n in sizes:
+        crisis = set(CRISIS_KEYWORDS) | {fake(rng.randint(1, 3)) for _ in range(n)}
+        themes = {t: kws + [fake(rng.randint(1, 2)) for _ in range(n // len(THEME_KEYWORDS))]
+                  for t, kws in THEME_KEYWORDS.items()}
+        pos = set(POS_WORDS) | {fake(1) for _ in range(n)}
+        neg = set(NEG_WORDS) | {fake(1) for _ in range(n)}
+        t = time.perf_counter()
+        scanner = MessageScanner(crisis, themes, pos, neg)
+        build_ms = (time.perf_counter() - t) * 1000
+        t = time.perf_counter()
+        for text in texts:
+            _substring_scan(text, crisis, themes, pos, neg)
+        old_us = (time.perf_counter() - t) / messages * 1e6
+        t = time.perf_counter()
+        for text in texts:
+            scanner.scan(text)
+        new_us = (time.perf_counter() - t) / messages * 1e6
+        report.append({"patterns": scanner.patterns, "build_ms": round(build_ms, 1),
+                       "substring_us": round(old_us, 1), "scanner_us": round(new_us, 1)})
+    return report
+
+# --- Multi-user service (asyncio, crisis-first scheduling) ---
+CRISIS_PRIORITY, ROUTINE_PRIORITY = 0, 1
+
+class ServiceBusy(Exception):
+    pass
+
+class UserSession:
+    def __init__(self, user, history=200):
+        self.user = user
+        self.chat_log = deque(maxlen=history)
+        self.mood = MoodStats()
+        self.pending = 0
+        self.backlog = deque()  # (text, crisis, queued_at, fut) in arrival order
+        self.active = False     # a worker is answering this user right now
+        self.scheduled = None   # best priority of this user's ticket in the queue
+        self.ticket = 0
+        self.last_active = time.monotonic()
+
+class WellnessService:
+    """
+    Serves many users from one event loop. Every incoming message is pre-screened
+    with detect_crisis and appended to its user's backlog; the shared PriorityQueue
+    holds one ticket per user with work (crisis first, then arrival order), and
+    `workers` tasks take tickets and run generate_response on a thread pool.
+    A user is answered by one worker at a time, in the order they wrote, so their
+    chat log and mood stay ordered; a crisis message lifts its user's ticket to
+    crisis priority even when routine messages are ahead of it.
+    Routine messages are refused early (ServiceBusy) when their user already has
+    `max_pending` waiting or `max_queue` messages are waiting overall. Crisis
+    messages are always admitted and not counted against either cap, so under a
+    flood of them the backlog is bounded only by the clients.
+    """
+    def __init__(self, workers=4, max_pending=8, max_queue=10000, idle_timeout=900.0, prioritize=True):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_queue = max_queue
+        self.idle_timeout = idle_timeout
+        self.prioritize = prioritize
+        self.sessions = {}
+        self.seq = itertools.count()
+        self.queue = None
+        self.waiting = 0
+        self.tasks = []
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.stats = Counter()
+
+    async def start(self):
+        self.queue = asyncio.PriorityQueue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self._evict_idle()))
+
+    async def stop(self):
+        for t in self.tasks:
+            t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    def session(self, user):
+        s = self.sessions.get(user)
+        if s is None:
+            s = self.sessions[user] = UserSession(user)
+        s.last_active = time.monotonic()
+        return s
+
+    def _schedule(self, s, crisis):
+        # (re)queue the user's ticket; a better priority pushes a second copy with
+        # the same ticket number, and whichever copy is taken first wins
+        priority = CRISIS_PRIORITY if crisis and self.prioritize else ROUTINE_PRIORITY
+        if s.active or (s.scheduled is not None and s.scheduled <= priority):
+            return
+        s.scheduled = priority
+        self.queue.put_nowait((priority, next(self.seq), s, s.ticket))
+
+    async def submit(self, user, text):
+        """Queue one message and wait for {"reply", "flagged", "mood", "queued_ms"}."""
+        s = self.session(user)
+        crisis = detect_crisis(text)
+        if not crisis:
+            if s.pending >= self.max_pending:
+                self.stats["rejected_user"] += 1
+                raise ServiceBusy("too many messages waiting for this user")
+            if self.waiting >= self.max_queue:
+                self.stats["rejected_full"] += 1
+                raise ServiceBusy("service overloaded, retry later")
+            self.waiting += 1
+        fut = asyncio.get_running_loop().create_future()
+        s.backlog.append((text, crisis, time.perf_counter(), fut))
+        s.pending += 1
+        self._schedule(s, crisis)
+        self.stats["crisis" if crisis else "routine"] += 1
+        try:
+            return await fut
+        finally:
+            s.pending -= 1
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, s, ticket = await self.queue.get()
+            if ticket != s.ticket or s.active or not s.backlog:
+                self.queue.task_done()  # stale copy of a ticket already taken
+                continue
+            s.ticket += 1
+            s.scheduled = None
+            s.active = True
+            text, crisis, queued_at, fut = s.backlog.popleft()
+            if not crisis:
+                self.waiting -= 1
+            try:
+                started = time.perf_counter()
+                reply, flagged = await loop.run_in_executor(self.executor, generate_response, text)
+                sent = sentiment_score(text)
+                mood = mood_from_sentiment(sent)
+                now = datetime.datetime.now()
+                s.chat_log.append({'who':'user','text':text,'ts':now,'sent':sent})
+                s.chat_log.append({'who':'bot','text':reply,'ts':now,'sent':0.0})
+                s.mood.add(mood)
+                if not fut.done():
+                    fut.set_result({"reply": reply, "flagged": flagged, "mood": mood,
+                                    "queued_ms": round((started - queued_at) * 1000, 3)})
+                self.stats["answered"] += 1
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            finally:
+                s.active = False
+                if s.backlog:
+                    self._schedule(s, any(item[1] for item in s.backlog))
+                self.queue.task_done()
+
+    async def _evict_idle(self):
+        while True:
+            await asyncio.sleep(min(60.0, self.idle_timeout))
+            cutoff = time.monotonic() - self.idle_timeout
+            for user in [u for u, s in self.sessions.items() if s.last_active < cutoff and not s.pending]:
+                del self.sessions[user]
+                self.stats["evicted"] += 1
+
+    async def handle_connection(self, reader, writer):
+        """JSON lines: {"user", "text", "id"?} in, {"id", "user", "reply", "flagged", "mood"} or {"error"} out."""
+        lock = asyncio.Lock()
+        pending = set()
+
+        async def answer(req):
+            try:
+                res = {"id": req.get("id"), "user": req["user"], **await self.submit(str(req["user"]), str(req["text"]))}
+            except ServiceBusy as e:
+                res = {"id": req.get("id"), "error": str(e), "retry": True}
+            except (KeyError, TypeError) as e:
+                res = {"id": req.get("id") if isinstance(req, dict) else None, "error": f"bad request: {e}"}
+            async with lock:
+                writer.write((json.dumps(res, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    req = json.loads(line)
+                except ValueError:
+                    req = None
+                task = asyncio.create_task(answer(req if isinstance(req, dict) else {}))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        await self.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Wellness service on {host}:{port} ({self.workers} workers). Ctrl+C to stop.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+def _p(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q / 100 * len(values)))], 2)
+
+async def _load(service, users, messages, crisis_share, rate, seed):
+    rng = random.Random(seed)
+    routine = ["I feel anxious about work and my boss", "Exams are stressing me out", "Had an okay day, a bit tired",
+               "My partner and I argued again", "I can't sleep lately and feel down", "Feeling calm and better today"]
+    crisis = ["I want to die", "I can't go on anymore", "I keep thinking about suicide"]
+    lat = {"crisis": [], "routine": []}
+    rejected = Counter()
+
+    async def one(user, text, kind):
+        t = time.perf_counter()
+        try:
+            await service.submit(user, text)
+            lat[kind].append((time.perf_counter() - t) * 1000)
+        except ServiceBusy:
+            rejected[kind] += 1
+
+    await service.start()
+    tasks = []
+    t0 = time.perf_counter()
+    for i in range(messages):
+        kind = "crisis" if rng.random() < crisis_share else "routine"
+        text = rng.choice(crisis if kind == "crisis" else routine) + f" ({i})"  # unique text: no scan-cache hits
+        tasks.append(asyncio.create_task(one(f"user{rng.randrange(users)}", text, kind)))
+        if rate:
+            await asyncio.sleep(rng.expovariate(rate))  # open-loop Poisson arrivals
+        elif i % 256 == 255:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - t0
+    await service.stop()
+    return {
+        "prioritized": service.prioritize,
+        "messages": messages,
+        "throughput_per_sec": round(sum(len(v) for v in lat.values()) / elapsed, 1),
+        **{f"{k}_p50_ms": _p(v, 50) for k, v in lat.items()},
+        **{f"{k}_p99_ms": _p(v, 99) for k, v in lat.items()},
+        "rejected": dict(rejected),
+    }
+
+def load_test(users=500, messages=20000, crisis_share=0.02, rate=None, workers=4, max_pending=64, seed=4):
+    """Run the same burst (or Poisson `rate` msgs/s) with and without crisis-first scheduling."""
+    return [asyncio.run(_load(WellnessService(workers, max_pending, prioritize=flag), users, messages, crisis_share, rate, seed))
+            for flag in (True, False)]
+
+# --- Batch journal scoring (offline analytics) ---
+USER_COLUMNS = ("user", "user_id", "client", "client_id", "patient_id")
+TS_COLUMNS = ("ts", "timestamp", "date", "created_at", "time")
+TEXT_COLUMNS = ("text", "entry", "message", "body", "content")
+
+def _first(row, names, default=None):
+    for n in names:
+        if n in row and row[n] not in (None, ""):
+            return row[n]
+    return default
+
+_ISO_DAY = re.compile(r"\d{4}-\d{2}-\d{2}")
+_TIME_SUFFIX = re.compile(r"[ T,]+\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?\s*([AaPp][Mm])?\s*(Z|[+-]\d{2}:?\d{2})?$")
+DAY_FORMATS = ("%Y%m%d", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%d.%m.%Y", "%d %b %Y", "%b %d %Y", "%d %B %Y", "%B %d %Y")
+
+@lru_cache(maxsize=4096)
+def _parse_day(text):
+    date_part = _TIME_SUFFIX.sub("", text).replace(",", "")
+    for fmt in DAY_FORMATS:
+        try:
+            return datetime.datetime.strptime(date_part, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+def entry_day(value):
+    """'YYYY-MM-DD' for an ISO string, epoch seconds/ms or a common date format; None if unreadable."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            ts = value / 1000 if value > 1e11 else value  # epoch milliseconds
+            return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).date().isoformat()
+        except (ValueError, OverflowError, OSError):
+            return None
+    text = str(value or "").strip()
+    if _ISO_DAY.match(text):
+        try:
+            return datetime.date.fromisoformat(text[:10]).isoformat()
+        except ValueError:
+            return None
+    if len(text) == 8 and text.isdigit():  # compact 20240314
+        return _parse_day(text)
+    if text.replace(".", "", 1).isdigit():
+        return entry_day(float(text))
+    return _parse_day(text) if text else None
+
+def _json_rows(f, skipped):
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if isinstance(row, dict):
+            yield row
+        else:
+            skipped["bad_lines"] += 1
+
+def read_entries(path, skipped=None):
+    """
+    Yield (user, day 'YYYY-MM-DD', text) from a JSONL or CSV export, one entry at a time.
+    Malformed JSONL lines are skipped and counted in skipped["bad_lines"]; entries whose
+    timestamp is missing or unreadable (see entry_day) in skipped["bad_timestamps"].
+    """
+    skipped = Counter() if skipped is None else skipped
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = ({k.strip().lower(): v for k, v in r.items() if k} for r in csv.DictReader(f))
+        else:
+            rows = _json_rows(f, skipped)
+        for row in rows:
+            text = _first(row, TEXT_COLUMNS)
+            if not text:
+                continue
+            day = entry_day(_first(row, TS_COLUMNS))
+            if day is None:
+                skipped["bad_timestamps"] += 1
+                continue
+            yield str(_first(row, USER_COLUMNS, "unknown")), day, str(text)
+
+def _score_chunk(entries):
+    # per (user, day): [entries, sentiment sum, mood sum, mood min, mood max, crisis count, {theme: n}]
+    out = {}
+    scan = SCANNER.scan
+    for user, day, text in entries:
+        r = scan(text)
+        sent = sentiment_from_scan(r)
+        mood = mood_from_sentiment(sent)
+        a = out.get((user, day))
+        if a is None:
+            a = out[(user, day)] = [0, 0.0, 0, mood, mood, 0, Counter()]
+        a[0] += 1
+        a[1] += sent
+        a[2] += mood
+        a[3] = min(a[3], mood)
+        a[4] = max(a[4], mood)
+        a[5] += bool(r.crisis)
+        a[6].update(r.themes)
+    return len(entries), out
+
+def _merge_daily(total, part):
+    for key, b in part.items():
+        a = total.get(key)
+        if a is None:
+            total[key] = b
+            continue
+        a[0] += b[0]
+        a[1] += b[1]
+        a[2] += b[2]
+        a[3] = min(a[3], b[3])
+        a[4] = max(a[4], b[4])
+        a[5] += b[5]
+        a[6].update(b[6])
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+def score_journal(in_path, out_path, workers=1, chunk_size=5000):
+    """
+    Score every entry (sentiment, mood, themes, crisis flag) and write per-user daily
+    aggregates as CSV. Entries are streamed in chunks; memory grows with the number of
+    user-days, not entries. Returns counts, overall theme totals and throughput.
+    """
+    start = time.perf_counter()
+    daily = {}
+    entries = 0
+    skipped = Counter()
+    chunks = _chunks(read_entries(in_path, skipped), chunk_size)
+    def absorb(results):
+        nonlocal entries
+        for n, part in results:
+            entries += n
+            _merge_daily(daily, part)
+    if workers > 1:
+        # at most 2 chunks per worker in flight keeps memory flat however long the export
+        # is; parts are merged in input order so the CSV matches a single-process run
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = deque()
+            for chunk in chunks:
+                running.append(pool.submit(_score_chunk, chunk))
+                if len(running) >= 2 * workers:
+                    absorb([running.popleft().result()])
+            absorb(fut.result() for fut in running)
+    else:
+        absorb(map(_score_chunk, chunks))
+    themes = Counter()
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["user", "day", "entries", "avg_sentiment", "avg_mood", "min_mood", "max_mood", "crisis_entries", "themes"])
+        for (user, day), (n, sent, mood, lo, hi, crisis, th) in sorted(daily.items()):
+            themes.update(th)
+            w.writerow([user, day, n, round(sent / n, 4), round(mood / n, 2), lo, hi, crisis,
+                        ";".join(f"{k}:{v}" for k, v in th.most_common())])
+    elapsed = time.perf_counter() - start
+    return {"entries": entries, "skipped_lines": skipped["bad_lines"],
+            "bad_timestamps": skipped["bad_timestamps"], "user_days": len(daily),
+            "themes": dict(themes.most_common()),
+            "seconds": round(elapsed, 2), "entries_per_sec": round(entries / max(elapsed, 1e-9))}
+
+def write_sample_journal(path, entries=1_000_000, users=2000, days=180, seed=9):
+    rng = random.Random(seed)
+    texts = ["Work was stressful, my boss kept pushing", "Slept badly again, feeling tired and down",
+             "A calm day, went for a walk and felt better", "Exam stress is building up",
+             "Argued with my partner, feeling hurt", "Feeling hopeful about the week", "I can't go on like this"]
+    start = datetime.date(2024, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(entries):
+            day = start + datetime.timedelta(days=rng.randrange(days))
+            f.write(json.dumps({"user": f"u{rng.randrange(users)}", "ts": day.isoformat(),
+                                "text": f"{rng.choice(texts)} #{i}"}) + "\n")
+
+# --- UI ---
+INIT_TEXT = ("Hi — I'm a supportive assistant. You can share how you're feeling. "
+             "I can suggest coping steps, a short breathing practice, or help you plan next small steps. "
+             "If you're in immediate danger, please contact local emergency services.")
+
+def run_widget_chatbot():
     message_box = widgets.Textarea(placeholder="Type how you're feeling, e.g. 'I'm feeling very anxious about exams'...", layout=widgets.Layout(width='720px', height='90px'))
     send_btn = widgets.Button(description="Send", button_style='primary', layout=widgets.Layout(width='120px'))
     tips_btn = widgets.Button(description="Coping Tips", layout=widgets.Layout(width='120px'))
     breath_btn = widgets.Button(description="Breathing Exercise", layout=widgets.Layout(width='160px'))
     save_btn = widgets.Button(description="Save Chat", layout=widgets.Layout(width='120px'))
     output = widgets.Output(layout={'border':'1px solid #ddd', 'width':'760px', 'height':'420px', 'overflow':'auto'})
+    mood_box = widgets.HTML(layout=widgets.Layout(width='760px'))
 
+    if journal is None:
+        open_journal()
     # initial assistant greeting
-    init_text = ("Hi — I'm a supportive assistant. You can share how you're feeling. "
-                 "I can suggest coping steps, a short breathing practice, or help you plan next small steps. "
-                 "If you're in immediate danger, please contact local emergency services.")
-    chat_log.append({'who':'bot','text':init_text,'ts':datetime.datetime.now(),'sent':0.0})
+    if not chat_log:
+        log_message({'who':'bot','text':INIT_TEXT,'ts':datetime.datetime.now(),'sent':0.0})
+    view = ChatView(output, mood_box)
 
-    def refresh():
-        with output:
-            output.clear_output()
-            display(HTML(render_chat_html()))
+    def add(item, mood=None):
+        log_message(item, mood)
+        view.append(item)
 
     def on_send(b):
         user_text = message_box.value.strip()
@@ -216,38 +1035,33 @@ if HAS_WIDGETS:
         # append user
         ts = datetime.datetime.now()
         s = sentiment_score(user_text)
-        chat_log.append({'who':'user','text':user_text,'ts':ts,'sent':s})
+        mood = mood_from_sentiment(s)
+        add({'who':'user','text':user_text,'ts':ts,'sent':s}, mood)
         # generate bot response
         bot_text, flagged = generate_response(user_text)
-        chat_log.append({'who':'bot','text':bot_text,'ts':datetime.datetime.now(),'sent':0.0})
+        add({'who':'bot','text':bot_text,'ts':datetime.datetime.now(),'sent':0.0})
         # update mood
-        mood_history.append(mood_from_sentiment(s))
+        record_mood(mood)
+        view.update_mood()
         message_box.value = ""
-        refresh()
         # if crisis flagged, also show immediate advice block below
         if flagged:
-            with output:
-                display(HTML("<div style='padding:10px; margin-top:8px; border-radius:8px; background:#fff0f0;'><b>Important:</b> If you are in immediate danger or planning to harm yourself, please contact local emergency services right now and reach out to someone you trust.</div>"))
+            view.show("<div style='padding:10px; margin-top:8px; border-radius:8px; background:#fff0f0;'><b>Important:</b> If you are in immediate danger or planning to harm yourself, please contact local emergency services right now and reach out to someone you trust.</div>")
 
     def on_tips(b):
-        chat_log.append({'who':'bot','text':"Here are some practical coping tips:",'ts':datetime.datetime.now(),'sent':0.0})
-        refresh()
-        with output:
-            display(HTML(coping_tips_html()))
+        add({'who':'bot','text':"Here are some practical coping tips:",'ts':datetime.datetime.now(),'sent':0.0})
+        view.show(COPING_TIPS_HTML)
 
     def on_breath(b):
-        chat_log.append({'who':'bot','text':"Let's try a short breathing exercise:",'ts':datetime.datetime.now(),'sent':0.0})
-        refresh()
-        with output:
-            display(HTML(breathing_html()))
+        add({'who':'bot','text':"Let's try a short breathing exercise:",'ts':datetime.datetime.now(),'sent':0.0})
+        view.show(BREATHING_HTML)
 
     def on_save(b):
         path = save_transcript()
-        with output:
-            if path:
-                display(HTML(f"<div style='padding:8px; background:#e8f5e9; border-radius:6px;'>Saved chat to <b>{path}</b></div>"))
-            else:
-                display(HTML("<div style='padding:8px; background:#fff3cd; border-radius:6px;'>No chat to save yet.</div>"))
+        if path:
+            view.show(f"<div style='padding:8px; background:#e8f5e9; border-radius:6px;'>Chat is journaled to <b>{path}</b> (synced to disk)</div>")
+        else:
+            view.show("<div style='padding:8px; background:#fff3cd; border-radius:6px;'>No chat to save yet.</div>")
 
     send_btn.on_click(on_send)
     tips_btn.on_click(on_tips)
@@ -257,14 +1071,14 @@ if HAS_WIDGETS:
     # layout
     controls_top = widgets.HBox([message_box])
     controls_bot = widgets.HBox([send_btn, tips_btn, breath_btn, save_btn])
-    display(widgets.VBox([widgets.HTML("<h2 style='font-family:Arial;color:#2c3e50;'>🤝 AI Mental Wellness Assistant</h2><div style='color:#555; font-family:Arial;'>Supportive and non-clinical. If you're in immediate danger call local emergency services.</div>"), controls_top, controls_bot, output]))
-    refresh()
+    display(widgets.VBox([widgets.HTML("<h2 style='font-family:Arial;color:#2c3e50;'>🤝 AI Mental Wellness Assistant</h2><div style='color:#555; font-family:Arial;'>Supportive and non-clinical. If you're in immediate danger call local emergency services.</div>"), controls_top, controls_bot, output, mood_box]))
 
-else:
-    # CLI fallback
+def run_cli_chatbot():
     print("Running in simple CLI mode (ipywidgets not available). Type 'exit' to quit.")
     print("Note: This is not a substitute for professional help.")
-    print(init_text)
+    print(INIT_TEXT)
+    if journal is None:
+        open_journal()
     while True:
         user_text = input("\nYou: ").strip()
         if not user_text:
@@ -274,11 +1088,12 @@ else:
             break
         ts = datetime.datetime.now()
         s = sentiment_score(user_text)
-        chat_log.append({'who':'user','text':user_text,'ts':ts,'sent':s})
+        mood = mood_from_sentiment(s)
+        log_message({'who':'user','text':user_text,'ts':ts,'sent':s}, mood)
         bot_text, flagged = generate_response(user_text)
         print("\nAssistant:", bot_text)
-        chat_log.append({'who':'bot','text':bot_text,'ts':datetime.datetime.now(),'sent':0.0})
-        mood_history.append(mood_from_sentiment(s))
+        log_message({'who':'bot','text':bot_text,'ts':datetime.datetime.now(),'sent':0.0})
+        record_mood(mood)
         if flagged:
             print("\n!!! If you are in immediate danger, contact local emergency services right now and reach out to someone you trust.")
         # quick options
@@ -294,3 +1109,78 @@ else:
                 print("Saved to", path)
             else:
                 print("Nothing to save.")
+
+# --- Command line (scripts; the notebook cell just starts the UI) ---
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(prog="mental-health-chatbot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("bench-scan", help="per-message detector latency as lexicons grow")
+    p.add_argument("--sizes", default="10,100,1000,5000")
+    p.add_argument("--messages", type=int, default=2000)
+    p = sub.add_parser("mood", help="daily/weekly mood series from a journal")
+    p.add_argument("--journal", default=JOURNAL_PATH)
+    p.add_argument("--period", choices=["day", "week"], default="week")
+    p = sub.add_parser("export", help="journal -> text transcript")
+    p.add_argument("out")
+    p.add_argument("--journal", default=JOURNAL_PATH)
+    p = sub.add_parser("bench-journal", help="append rate and summary load time")
+    p.add_argument("path")
+    p.add_argument("--messages", type=int, default=200_000)
+    p = sub.add_parser("serve", help="multi-user JSON-lines TCP service")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=4)
+    p = sub.add_parser("bench-load", help="p99 latency for crisis vs routine messages under load")
+    p.add_argument("--users", type=int, default=500)
+    p.add_argument("--messages", type=int, default=20000)
+    p.add_argument("--crisis-share", type=float, default=0.02)
+    p.add_argument("--rate", type=float, help="Poisson arrivals per second (default: one burst)")
+    p.add_argument("--workers", type=int, default=4)
+    p = sub.add_parser("score", help="batch-score a JSONL/CSV journal export into daily aggregates")
+    p.add_argument("entries")
+    p.add_argument("out_csv")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--chunk-size", type=int, default=5000)
+    p = sub.add_parser("sample-journal", help="write a synthetic journal export for benchmarks")
+    p.add_argument("path")
+    p.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+    if args.command == "score":
+        print(json.dumps(score_journal(args.entries, args.out_csv, args.workers, args.chunk_size), indent=2))
+    elif args.command == "sample-journal":
+        write_sample_journal(args.path, args.entries)
+    elif args.command == "serve":
+        try:
+            asyncio.run(WellnessService(args.workers).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "bench-load":
+        for row in load_test(args.users, args.messages, args.crisis_share, args.rate, args.workers):
+            print(json.dumps(row))
+    elif args.command == "mood":
+        j = MoodJournal(args.journal, readonly=True)
+        for row in j.series(args.period):
+            print("{}  n={:<5} avg={:<5} min={} max={}".format(*row))
+        if j.bad_lines:
+            print(f"skipped {j.bad_lines} corrupt journal lines", file=sys.stderr)
+        j.close()
+    elif args.command == "export":
+        out, bad_lines = export_journal_text(args.journal, args.out)
+        print(out)
+        if bad_lines:
+            print(f"skipped {bad_lines} corrupt journal lines", file=sys.stderr)
+    elif args.command == "bench-journal":
+        print(json.dumps(benchmark_journal(args.path, args.messages), indent=2))
+    elif args.command == "bench-scan":
+        for row in benchmark_scanner([int(x) for x in args.sizes.split(",")], args.messages):
+            print(json.dumps(row))
+
+CLI_COMMANDS = ("bench-scan", "mood", "export", "bench-journal", "serve", "bench-load", "score", "sample-journal")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        run_command_line(sys.argv[1:])
+    elif HAS_WIDGETS:
+        run_widget_chatbot()
+    else:
+        run_cli_chatbot()
@@ -1,17 +1,33 @@
-import math
+import math, os, re, io, sys, array, csv, json, time, random, sqlite3, argparse, datetime, itertools, subprocess, tempfile
 from collections import defaultdict, Counter
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
-# Optional pretty output with 'rich' (falls back to plain prints)
-USE_RICH = True
+# numpy powers the batch (many-household) analysis; optional
 try:
-    from rich.console import Console
-    from rich.table import Table
-    from rich.panel import Panel
-    from rich.rule import Rule
-    from rich import box
-    console = Console()
+    import numpy as np
 except Exception:
-    USE_RICH = False
+    np = None
+
+# Optional pretty output with 'rich' (falls back to plain prints).
+# Imported on first interactive use so headless/batch runs don't pay for it.
+USE_RICH = False
+console = Table = Panel = Rule = box = None
+
+def enable_rich() -> bool:
+    global USE_RICH, console, Table, Panel, Rule, box
+    if console is None:
+        try:
+            from rich.console import Console
+            from rich.table import Table
+            from rich.panel import Panel
+            from rich.rule import Rule
+            from rich import box
+            console = Console()
+            USE_RICH = True
+        except Exception:
+            USE_RICH = False
+    return USE_RICH
 
 # -----------------------------
 # Helpers for printing
@@ -57,31 +73,142 @@ WANTS_KEYS = {
 DEBT_KEYS = {"loan","loans","debt","credit","emi","card"}
 SAVINGS_KEYS = {"savings","invest","investment","investments","sip","mutual","rd","fd"}
 
+# Highest priority first: a category matching several buckets gets the earliest one
+DEFAULT_RULES = [
+    ("Savings/Investments", SAVINGS_KEYS),
+    ("Debt/Loans", DEBT_KEYS),
+    ("Needs", NEEDS_KEYS),
+    ("Wants", WANTS_KEYS),
+]
+DEFAULT_BUCKET = "Wants"
+RULES_PATH = os.environ.get("FINANCE_RULES_PATH")  # optional JSON/CSV keyword file
+
+class CategoryClassifier:
+    """
+    Aho-Corasick automaton over all bucket keywords, built once.
+    Same semantics as the old substring scan: a keyword matches anywhere in the
+    lower-cased category and the highest-priority bucket hit wins. Results are
+    memoized per normalized description in a bounded LRU cache.
+    """
+    def __init__(self, rules=DEFAULT_RULES, default=DEFAULT_BUCKET, cache_size=100_000):
+        self.buckets = [b for b, _ in rules]
+        self.default = default
+        self.keywords = sum(len(words) for _, words in rules)
+        self._build(rules)
+        self._cached = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _build(self, rules):
+        goto = [{}]
+        rank = [len(rules)]  # best (lowest) bucket rank ending at each state; len(rules) = none
+        for r, (_, words) in enumerate(rules):
+            for w in words:
+                w = w.strip().lower()
+                if not w:
+                    continue
+                s = 0
+                for ch in w:
+                    nxt = goto[s].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[s][ch] = nxt
+                        goto.append({})
+                        rank.append(len(rules))
+                    s = nxt
+                rank[s] = min(rank[s], r)
+        # BFS for failure links; fold each state's suffix matches into its rank
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for s in queue:
+            for ch, t in goto[s].items():
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[t] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != t else 0
+                rank[t] = min(rank[t], rank[fail[t]])
+                queue.append(t)
+        self._goto, self._fail, self._rank = goto, fail, rank
+
+    def _scan(self, key: str) -> str:
+        goto, fail, rank = self._goto, self._fail, self._rank
+        best = len(self.buckets)
+        s = 0
+        for ch in key:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if rank[s] < best:
+                best = rank[s]
+                if best == 0:
+                    break
+        return self.buckets[best] if best < len(self.buckets) else self.default
+
+    def bucket(self, category: str) -> str:
+        return self._cached(category.strip().lower())
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+    @classmethod
+    def from_file(cls, path, include_defaults=True, **kw):
+        return cls(load_rules(path, include_defaults), **kw)
+
+def load_rules(path, include_defaults=True):
+    """
+    Read keyword rules from JSON ({"Bucket": ["kw", ...], ...}, in priority order)
+    or CSV (bucket,keyword rows). With include_defaults, the file's keywords are
+    added to the built-in buckets and new buckets rank after them.
+    """
+    rules = {}
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            for bucket, words in json.load(f).items():
+                rules.setdefault(bucket, set()).update(words)
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.reader(f):
+                if len(row) < 2 or not row[0].strip() or row[0].strip().lower() == "bucket":
+                    continue
+                rules.setdefault(row[0].strip(), set()).add(row[1])
+    if include_defaults:
+        merged = {b: set(words) for b, words in DEFAULT_RULES}
+        for bucket, words in rules.items():
+            merged.setdefault(bucket, set()).update(words)
+        rules = merged
+    return list(rules.items())
+
+CLASSIFIER = CategoryClassifier.from_file(RULES_PATH) if RULES_PATH else CategoryClassifier()
+
+def use_rules_file(path, include_defaults=True):
+    global CLASSIFIER
+    CLASSIFIER = CategoryClassifier.from_file(path, include_defaults)
+    return CLASSIFIER
+
 def bucket_for(category: str) -> str:
-    key = category.strip().lower()
-    # exact/contains check
-    def hit(words):
-        return any(w in key for w in words)
-    if hit(SAVINGS_KEYS): return "Savings/Investments"
-    if hit(DEBT_KEYS):    return "Debt/Loans"
-    if hit(NEEDS_KEYS):   return "Needs"
-    if hit(WANTS_KEYS):   return "Wants"
-    # default guess
-    return "Wants"
+    return CLASSIFIER.bucket(category)
 
 # -----------------------------
 # Core analysis
 # -----------------------------
-def analyze(income: float, expense_pairs: list[tuple[str, float]]):
-    # Sum by category and bucket
-    by_category = defaultdict(float)
+def aggregate_expenses(expense_pairs, by_category=None):
+    # Sum by category (names normalized with .title(), negatives ignored)
+    by_category = defaultdict(float) if by_category is None else by_category
     for cat, amt in expense_pairs:
         by_category[cat.strip().title()] += float(max(0.0, amt))
+    return by_category
 
+def bucket_totals(by_category: dict) -> dict:
     by_bucket = defaultdict(float)
     for cat, amt in by_category.items():
         b = bucket_for(cat)
         by_bucket[b] += amt
+    return by_bucket
+
+def analyze(income: float, expense_pairs: list[tuple[str, float]]):
+    return analyze_categories(income, aggregate_expenses(expense_pairs))
+
+def analyze_categories(income: float, by_category: dict):
+    # Same as analyze(), starting from already aggregated per-category totals
+    by_bucket = bucket_totals(by_category)
 
     total_expenses = sum(by_category.values())
     savings_monthly = max(0.0, income - total_expenses)
@@ -153,7 +280,7 @@ def build_tips(analysis: dict) -> list[str]:
     # Deficit or low savings
     if exp > inc:
         tips.append("You’re in a monthly deficit. Aim to trim 10–15% from top ‘Wants’ categories and renegotiate any fixed bills.")
-    elif (sv / inc) < 0.10:
+    elif inc > 0 and (sv / inc) < 0.10:  # no rate without income (tip_flags' 0/0 is NaN too)
         tips.append("Your savings rate is below 10%. Try to push towards 15–20% by cutting a small % from Wants and renegotiating fixed costs.")
 
     # 50/30/20 nudges
@@ -165,7 +292,19 @@ def build_tips(analysis: dict) -> list[str]:
         tips.append("Savings below the 20% benchmark. Automate transfers on payday to make saving the default.")
 
     # Debt strategies
-    if debt > 0:
+    plan = analysis.get("debt_plan")
+    if plan and plan["avalanche"]["payoff_order"]:
+        av, sb = plan["avalanche"], plan["snowball"]
+        if not math.isfinite(av["months"]):
+            tips.append("At your current debt budget the balances keep growing. Raise payments above the monthly interest, starting with the highest-APR debt.")
+        elif av["payoff_order"] == sb["payoff_order"]:
+            tips.append(f"Your debts clear in {av['months']:.0f} months at the current budget; Avalanche and Snowball agree on the order, "
+                        f"so put any extra on {av['payoff_order'][0][0]} first.")
+        else:
+            saved = sb["interest"] - av["interest"]
+            tips.append(f"Avalanche clears your debts in {av['months']:.0f} months and saves ₹{fmt_money(max(0.0, saved))} interest vs Snowball"
+                        f" ({sb['months']:.0f} months). Snowball pays off {sb['payoff_order'][0][0]} first if quick wins keep you motivated.")
+    elif debt > 0:
         tips.append("You have loan/credit outflow. Use **Avalanche** (pay highest interest first) or **Snowball** (smallest balance first) for faster payoff. Make at least the minimums on all debts.")
 
     # Emergency fund
@@ -198,6 +337,389 @@ def build_tips(analysis: dict) -> list[str]:
             deduped.append(t)
     return deduped[:8]
 
+# -----------------------------
+# Batch analysis (households × categories, vectorized)
+# -----------------------------
+def _batch_columns(table, categories=None, income=None):
+    # Accept a DataFrame (one column per category, plus 'income') or arrays
+    if hasattr(table, "columns"):
+        cols = [c for c in table.columns if c != "income"]
+        if income is None:
+            income = table["income"].to_numpy(dtype=float)
+        return np.asarray(income, dtype=float), table[cols].to_numpy(dtype=float), [str(c) for c in cols]
+    return np.asarray(income, dtype=float), np.asarray(table, dtype=float), list(categories)
+
+def analyze_batch(table, categories=None, income=None):
+    """
+    Vectorized analyze() for many households at once.
+    `table` is an (H, C) amount array with `categories` naming the columns and
+    `income` an (H,) array, or a DataFrame with a column per category plus
+    'income'. Row i of the result equals analyze(income[i], zip(categories, table[i])).
+    Sums run column by column in the same order as analyze(), so floats match exactly.
+    """
+    if np is None:
+        raise RuntimeError("analyze_batch needs numpy: pip install numpy")
+    income, amounts, categories = _batch_columns(table, categories, income)
+    # Same normalization as aggregate_expenses: title-cased names, negatives ignored
+    names = []
+    index = {}
+    for c in categories:
+        key = c.strip().title()
+        if key not in index:
+            index[key] = len(names)
+            names.append(key)
+    H = amounts.shape[0]
+    by_category = np.zeros((H, len(names)))
+    for j, c in enumerate(categories):
+        by_category[:, index[c.strip().title()]] += np.maximum(0.0, amounts[:, j])
+
+    buckets = {}
+    total = np.zeros(H)
+    for j, c in enumerate(names):
+        col = by_category[:, j]
+        total += col
+        b = bucket_for(c)
+        buckets[b] = buckets[b] + col if b in buckets else col.copy()
+    zero = np.zeros(H)
+    bucket_needs = buckets.get("Needs", zero)
+    debt = buckets.get("Debt/Loans", zero)
+    wants = buckets.get("Wants", zero)
+    saved = buckets.get("Savings/Investments", zero)
+
+    savings_monthly = np.maximum(0.0, income - total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        savings_rate = np.where(income > 0, (savings_monthly / np.where(income > 0, income, 1.0)) * 100, 0.0)
+    target_needs = 0.50 * income
+    needs = bucket_needs + np.minimum(debt, target_needs * 0.4)
+    effective = savings_monthly + saved
+    essentials = np.where(needs > 0, needs, 0.5 * income)
+    ef_min = 3 * essentials
+    with np.errstate(divide="ignore"):
+        months = np.where(effective <= 0, np.inf, ef_min / np.maximum(1e-9, effective))
+    k = min(5, len(names))
+    top_idx = np.argsort(-by_category, axis=1, kind="stable")[:, :k]
+
+    return {
+        "categories": names,
+        "income": income,
+        "by_category": by_category,
+        "by_bucket": buckets,
+        "total_expenses": total,
+        "savings_monthly": savings_monthly,
+        "effective_saving": effective,
+        "savings_rate": savings_rate,
+        "target_needs": target_needs,
+        "target_wants": 0.30 * income,
+        "target_savings": 0.20 * income,
+        "needs": needs,
+        "wants": wants,
+        "debt": debt,
+        "explicit_saving": saved,
+        "ef_min": ef_min,
+        "ef_max": 6 * essentials,
+        "months_to_min": months,
+        "top_idx": top_idx,
+        "top_amounts": np.take_along_axis(by_category, top_idx, axis=1),
+    }
+
+def batch_row(batch: dict, i: int) -> dict:
+    """One household of an analyze_batch() result in analyze()'s dict shape."""
+    names = batch["categories"]
+    by_category = {c: float(batch["by_category"][i, j]) for j, c in enumerate(names)}
+    return {
+        "income": float(batch["income"][i]),
+        "by_category": by_category,
+        "by_bucket": {b: float(v[i]) for b, v in batch["by_bucket"].items()},
+        "total_expenses": float(batch["total_expenses"][i]),
+        "savings_monthly": float(batch["savings_monthly"][i]),
+        "effective_saving": float(batch["effective_saving"][i]),
+        "savings_rate": float(batch["savings_rate"][i]),
+        "targets": {
+            "needs": float(batch["target_needs"][i]),
+            "wants": float(batch["target_wants"][i]),
+            "savings": float(batch["target_savings"][i])
+        },
+        "bench_now": {
+            "needs": float(batch["needs"][i]),
+            "wants": float(batch["wants"][i]),
+            "debt": float(batch["debt"][i]),
+            "explicit_saving": float(batch["explicit_saving"][i])
+        },
+        "emergency_fund": {
+            "min_target": float(batch["ef_min"][i]),
+            "max_target": float(batch["ef_max"][i]),
+            "months_to_min": float(batch["months_to_min"][i])
+        },
+        "top_categories": [(names[j], by_category[names[j]]) for j in batch["top_idx"][i]]
+    }
+
+def tip_flags(batch: dict) -> dict:
+    """The rule checks behind build_tips() as boolean columns."""
+    inc, exp = batch["income"], batch["total_expenses"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low_rate = (batch["savings_monthly"] / inc) < 0.10
+    return {
+        "deficit": exp > inc,
+        "low_savings": ~(exp > inc) & low_rate,
+        "needs_over": batch["needs"] > batch["target_needs"] * 1.10,
+        "wants_over": batch["wants"] > batch["target_wants"] * 1.10,
+        "savings_under": batch["effective_saving"] < batch["target_savings"] * 0.8,
+        "has_debt": batch["debt"] > 0,
+        "ef_reachable": np.isfinite(batch["months_to_min"]),
+    }
+
+def synthetic_households(n, seed=7):
+    """Random incomes and spending over a fixed category list, for benchmarks."""
+    categories = ["Rent", "Groceries", "Utilities", "Transport", "Dining", "Subscriptions",
+                  "Shopping", "EMI", "Credit Card", "SIP", "Medical", "Travel"]
+    rng = np.random.default_rng(seed)
+    income = np.round(rng.uniform(20_000, 250_000, n), 2)
+    share = rng.dirichlet(np.ones(len(categories)), n) * rng.uniform(0.5, 1.2, (n, 1))
+    amounts = np.round(share * income[:, None], 2)
+    amounts[rng.random(amounts.shape) < 0.15] = 0.0
+    return income, amounts, categories
+
+def benchmark_batch(households=1_000_000, check=2_000, seed=7):
+    """Time analyze_batch() on synthetic households and spot-check it against analyze()."""
+    income, amounts, categories = synthetic_households(households, seed)
+    t = time.perf_counter()
+    batch = analyze_batch(amounts, categories, income)
+    flags = tip_flags(batch)
+    batch_s = time.perf_counter() - t
+    rng = np.random.default_rng(seed + 1)
+    sample = rng.choice(households, size=min(check, households), replace=False)
+    t = time.perf_counter()
+    mismatches = 0
+    for i in sample:
+        if analyze(float(income[i]), list(zip(categories, amounts[i].tolist()))) != batch_row(batch, i):
+            mismatches += 1
+    loop_s = (time.perf_counter() - t) / len(sample)
+    return {
+        "households": households,
+        "batch_seconds": round(batch_s, 3),
+        "households_per_sec": round(households / batch_s),
+        "loop_estimate_seconds": round(loop_s * households, 1),
+        "checked": len(sample),
+        "mismatches": mismatches,
+        "deficit_share": round(float(flags["deficit"].mean()), 4),
+    }
+
+# -----------------------------
+# Savings projection (Monte Carlo, vectorized over paths)
+# -----------------------------
+PROJECTION_DEFAULTS = {
+    "annual_return": 0.06, "return_vol": 0.08,           # on the saved balance
+    "inflation": 0.05, "inflation_vol": 0.015,            # drawn per path per year
+    "raise_real": 0.01, "raise_vol": 0.02,                # yearly real income growth
+    "job_loss_prob": 0.004, "job_loss_months": (2, 7),   # per month; income stops for [lo, hi) months
+    "shock_prob": 0.01, "shock_size": 1.0,                # per month; cost ~ lognormal × monthly needs
+}
+PROJECTION_PERCENTILES = (10, 25, 50, 75, 90)
+
+def _simulate_paths(task):
+    """Run one seed's share of paths; returns (hit_month, yearly_balance) arrays."""
+    income0, expenses0, target0, start, paths, years, params, seed = task
+    rng = np.random.default_rng(seed)
+    p = params
+    months = years * 12
+    balance = np.full(paths, float(start))
+    income = np.full(paths, float(income0))
+    expenses = np.full(paths, float(expenses0))
+    target = np.full(paths, float(target0))
+    out_of_work = np.zeros(paths, dtype=np.int32)
+    hit = np.full(paths, np.inf)
+    hit[balance >= target] = 0
+    yearly = np.empty((paths, years))
+    mu = p["annual_return"] / 12
+    vol = p["return_vol"] / math.sqrt(12)
+    lo, hi = p["job_loss_months"]
+    for m in range(months):
+        if m % 12 == 0:
+            infl = rng.normal(p["inflation"], p["inflation_vol"], paths)
+            step_infl = (1 + infl) ** (1 / 12)
+            step_raise = (1 + infl + rng.normal(p["raise_real"], p["raise_vol"], paths)) ** (1 / 12)
+        expenses *= step_infl
+        target *= step_infl
+        income *= step_raise
+        # Job loss: no income for a few months; shocks: one-off costs
+        lost = (out_of_work == 0) & (rng.random(paths) < p["job_loss_prob"])
+        out_of_work[lost] = rng.integers(lo, hi, int(lost.sum()))
+        earning = out_of_work == 0
+        np.maximum(out_of_work - 1, 0, out=out_of_work)
+        shock = (rng.random(paths) < p["shock_prob"]) * rng.lognormal(0.0, 0.5, paths) * p["shock_size"] * target / 3
+        balance += np.where(earning, income, 0.0) - expenses - shock
+        balance *= 1 + rng.normal(mu, vol, paths)
+        np.maximum(balance, 0.0, out=balance)
+        newly = (balance >= target) & np.isinf(hit)
+        hit[newly] = m + 1
+        if m % 12 == 11:
+            yearly[:, m // 12] = balance
+    return hit, yearly
+
+def project_savings(analysis: dict, paths=100_000, years=30, seed=None, workers=None,
+                    start_balance=0.0, **overrides):
+    """
+    Simulate `paths` futures of monthly saving toward the 3× needs emergency fund.
+    Income, spending and the target grow with per-path inflation; returns, job losses
+    and expense shocks are random. Paths are split over SeedSequence children and
+    run in a process pool when workers > 1. Returns percentile bands for the month
+    the target is reached and for the fund balance at each year end.
+    """
+    if np is None:
+        raise RuntimeError("project_savings needs numpy: pip install numpy")
+    params = {**PROJECTION_DEFAULTS, **overrides}
+    income = analysis["income"]
+    # Spending that competes with saving: everything except what is already labeled as saving
+    expenses = analysis["total_expenses"] - analysis["bench_now"]["explicit_saving"]
+    target = analysis["emergency_fund"]["min_target"]
+    n_tasks = max(1, workers or 1)
+    seeds = np.random.SeedSequence(seed).spawn(n_tasks)
+    sizes = [paths // n_tasks + (i < paths % n_tasks) for i in range(n_tasks)]
+    tasks = [(income, expenses, target, start_balance, n, years, params, sq) for n, sq in zip(sizes, seeds)]
+    t = time.perf_counter()
+    if n_tasks > 1:
+        with ProcessPoolExecutor(max_workers=n_tasks) as pool:
+            parts = list(pool.map(_simulate_paths, tasks))
+    else:
+        parts = [_simulate_paths(tasks[0])]
+    hit = np.concatenate([h for h, _ in parts])
+    yearly = np.concatenate([y for _, y in parts])
+    reached = np.isfinite(hit)
+    q = PROJECTION_PERCENTILES
+    return {
+        "paths": paths,
+        "years": years,
+        "seconds": time.perf_counter() - t,
+        "target": target,
+        "reached_share": float(reached.mean()),
+        # Unreached paths sort last (inf), so upper bands may read 'not reached'
+        "months_to_target": dict(zip(q, np.percentile(hit, q, method="lower").tolist())),
+        "balance_bands": {y + 1: dict(zip(q, np.percentile(yearly[:, y], q).tolist())) for y in range(years)},
+    }
+
+def render_projection(projection: dict):
+    hr("Savings Projection (Monte Carlo)")
+    mt = projection["months_to_target"]
+    fmt_m = lambda v: f"{v:.0f} mo" if math.isfinite(v) else "not reached"
+    cprint(f"{projection['paths']:,} simulated paths over {projection['years']} years: "
+           f"{projection['reached_share'] * 100:.1f}% reach the 3× needs fund.")
+    cprint("Months to target: " + ", ".join(f"P{k} {fmt_m(v)}" for k, v in mt.items()))
+    shown = [y for y in (1, 3, 5, 10, 20, 30) if y in projection["balance_bands"]]
+    q = PROJECTION_PERCENTILES
+    if USE_RICH:
+        t = Table(title="Fund balance by year end (₹)", box=box.SIMPLE)
+        t.add_column("Year", justify="right")
+        for k in q:
+            t.add_column(f"P{k}", justify="right")
+        for y in shown:
+            t.add_row(str(y), *(f"{projection['balance_bands'][y][k]:,.0f}" for k in q))
+        console.print(t)
+    else:
+        print("{:>5}".format("Year") + "".join("{:>16}".format(f"P{k} (₹)") for k in q))
+        for y in shown:
+            print("{:>5}".format(y) + "".join("{:>16,.0f}".format(projection["balance_bands"][y][k]) for k in q))
+
+# -----------------------------
+# Debt payoff (avalanche vs snowball, vectorized over households × debts)
+# -----------------------------
+DEBT_STRATEGIES = ("avalanche", "snowball")
+
+def simulate_payoff(balances, aprs, minimums, budget, strategy="avalanche", max_months=600):
+    """
+    Month-by-month amortization for (H, D) arrays of debts (zero-balance columns are padding).
+    Each month interest accrues, every debt gets its minimum, and the rest of the fixed
+    monthly `budget` (H,) goes to debts in priority order: highest APR first (avalanche)
+    or smallest starting balance first (snowball). Paid-off minimums roll into the extra.
+    """
+    bal = np.array(balances, dtype=float, ndmin=2)
+    rate = np.array(aprs, dtype=float, ndmin=2) / 100 / 12
+    mins = np.array(minimums, dtype=float, ndmin=2)
+    budget = np.maximum(np.asarray(budget, dtype=float).reshape(-1), mins.sum(axis=1))
+    H, D = bal.shape
+    if strategy == "avalanche":
+        key = -rate
+    elif strategy == "snowball":
+        key = np.where(bal > 0, bal, np.inf)
+    else:
+        raise ValueError(f"unknown strategy {strategy!r}; expected one of {DEBT_STRATEGIES}")
+    # Work in priority order so the extra can be spread with one cumsum per month
+    order = np.argsort(key, axis=1, kind="stable")
+    bal = np.take_along_axis(bal, order, axis=1)
+    rate = np.take_along_axis(rate, order, axis=1)
+    mins = np.take_along_axis(mins, order, axis=1)
+    interest = np.zeros(H)
+    paid_month = np.where(bal > 0, np.inf, 0.0)
+    remaining = [bal.sum(axis=1)]
+    for m in range(1, max_months + 1):
+        if not (bal > 0).any():
+            break
+        charge = bal * rate
+        interest += charge.sum(axis=1)
+        bal += charge
+        pay = np.minimum(bal, mins)
+        extra = budget - pay.sum(axis=1)
+        left = bal - pay
+        # Each debt gets the extra left over after the debts ahead of it
+        before = np.cumsum(left, axis=1) - left
+        bal = left - np.clip(extra[:, None] - before, 0.0, left)
+        bal[bal < 1e-6] = 0.0
+        paid_month[(bal == 0) & np.isinf(paid_month)] = m
+        remaining.append(bal.sum(axis=1))
+    unsorted = np.empty_like(paid_month)
+    np.put_along_axis(unsorted, order, paid_month, axis=1)
+    paid_month = unsorted
+    return {
+        "strategy": strategy,
+        "months": paid_month.max(axis=1),           # inf if not cleared within max_months
+        "debt_months": paid_month,
+        "interest": interest,
+        "remaining": np.stack(remaining, axis=1),   # (H, months + 1) total balance per month
+    }
+
+def compare_strategies(debts, budget, max_months=600) -> dict:
+    """Avalanche vs snowball for one household's [(name, balance, apr, minimum), ...]."""
+    return compare_strategies_batch([debts], [budget], max_months)[0]
+
+def compare_strategies_batch(debt_lists, budgets, max_months=600) -> list[dict]:
+    """compare_strategies() for many households in one padded (H, D) simulation per strategy."""
+    H, D = len(debt_lists), max((len(d) for d in debt_lists), default=0)
+    cols = np.zeros((3, H, max(D, 1)))
+    for i, debts in enumerate(debt_lists):
+        for j, d in enumerate(debts):
+            cols[:, i, j] = d[1:4]
+    runs = {s: simulate_payoff(*cols, budgets, s, max_months) for s in DEBT_STRATEGIES}
+    plans = []
+    for i, debts in enumerate(debt_lists):
+        plan = {"budget": max(budgets[i], sum(d[3] for d in debts)), "debts": debts}
+        for strategy, r in runs.items():
+            done = r["debt_months"][i, :len(debts)]
+            order = sorted(range(len(debts)), key=lambda j: done[j])
+            plan[strategy] = {
+                "months": float(done.max()) if len(debts) else 0.0,
+                "interest": float(r["interest"][i]),
+                "payoff_order": [(debts[j][0], float(done[j])) for j in order],
+            }
+        plans.append(plan)
+    return plans
+
+def render_debt_plan(plan: dict):
+    hr("Debt Payoff Plan")
+    cprint(f"Monthly debt budget: ₹{fmt_money(plan['budget'])} across {len(plan['debts'])} debt(s)")
+    fmt_m = lambda v: f"{v:.0f}" if math.isfinite(v) else "never"
+    rows = [(s.title(), fmt_m(plan[s]["months"]), fmt_money(plan[s]["interest"]),
+             " → ".join(n for n, _ in plan[s]["payoff_order"])) for s in DEBT_STRATEGIES]
+    if USE_RICH:
+        t = Table(box=box.SIMPLE)
+        for col, just in (("Strategy", "left"), ("Months", "right"), ("Interest (₹)", "right"), ("Payoff order", "left")):
+            t.add_column(col, justify=just)
+        for row in rows:
+            t.add_row(*row)
+        console.print(t)
+    else:
+        print("{:<10} {:>7} {:>15}  {}".format("Strategy", "Months", "Interest (₹)", "Payoff order"))
+        for row in rows:
+            print("{:<10} {:>7} {:>15}  {}".format(*row))
+
 # -----------------------------
 # Investment split (educational only)
 # -----------------------------
@@ -215,7 +737,23 @@ def sample_investment_split(monthly_saving: float):
 # -----------------------------
 # Pretty reporting
 # -----------------------------
-def render_report(analysis: dict):
+def bucket_rows(analysis: dict):
+    bnow, tgt = analysis["bench_now"], analysis["targets"]
+    return [
+        ("Needs", bnow["needs"], tgt["needs"]),
+        ("Wants", bnow["wants"], tgt["wants"]),
+        ("Debt/Loans", bnow["debt"], 0.15 * analysis["income"]),  # soft guide: keep debt service reasonable
+        ("Savings/Investments (labeled)", analysis["by_bucket"].get("Savings/Investments", 0.0), tgt["savings"])
+    ]
+
+def ef_pace_text(ef: dict) -> str:
+    if math.isfinite(ef["months_to_min"]):
+        return f"At current saving pace, ≈ {ef['months_to_min']:.1f} months to reach 3× needs."
+    return "Start with a small automatic monthly transfer to build your 3–6× needs buffer."
+
+DISCLAIMER = "[Note] This tool uses simple rules for educational purposes and isn’t financial advice."
+
+def render_report(analysis: dict, projection: dict | None = None):
     inc  = analysis["income"]
     exp  = analysis["total_expenses"]
     sv   = analysis["savings_monthly"]
@@ -241,12 +779,7 @@ def render_report(analysis: dict):
 
     # Bucket table
     hr("Spending by Buckets")
-    rows = [
-        ("Needs", bnow["needs"], tgt["needs"]),
-        ("Wants", bnow["wants"], tgt["wants"]),
-        ("Debt/Loans", bnow["debt"], 0.15 * inc),  # soft guide: keep debt service reasonable
-        ("Savings/Investments (labeled)", analysis["by_bucket"].get("Savings/Investments", 0.0), tgt["savings"])
-    ]
+    rows = bucket_rows(analysis)
     if USE_RICH:
         t = Table(title="Current vs. Guideline (50/30/20)", box=box.SIMPLE_HEAVY)
         t.add_column("Bucket", style="bold")
@@ -278,10 +811,11 @@ def render_report(analysis: dict):
     ef = analysis["emergency_fund"]
     hr("Emergency Fund Plan")
     cprint(f"Target: ₹{fmt_money(ef['min_target'])} to ₹{fmt_money(ef['max_target'])} (≈3–6× monthly needs)")
-    if math.isfinite(ef["months_to_min"]):
-        cprint(f"At current saving pace, ≈ {ef['months_to_min']:.1f} months to reach 3× needs.")
-    else:
-        cprint("Start with a small automatic monthly transfer to build your 3–6× needs buffer.")
+    cprint(ef_pace_text(ef))
+    if analysis.get("debt_plan"):
+        render_debt_plan(analysis["debt_plan"])
+    if projection:
+        render_projection(projection)
 
     # Investment split (educational only)
     inv = sample_investment_split(analysis["effective_saving"])
@@ -308,7 +842,280 @@ def render_report(analysis: dict):
 
     # Disclaimer
     hr()
-    cprint("[Note] This tool uses simple rules for educational purposes and isn’t financial advice.", style="dim" if USE_RICH else None)
+    cprint(DISCLAIMER, style="dim" if USE_RICH else None)
+
+# -----------------------------
+# Headless reports (text / markdown / json, batch)
+# -----------------------------
+REPORT_FORMATS = {"text": ".txt", "markdown": ".md", "json": ".json"}
+
+def _finite(x):
+    return x if math.isfinite(x) else None
+
+def report_model(analysis: dict, projection: dict | None = None) -> dict:
+    """Everything render_report() shows, as plain JSON-ready data."""
+    ef = analysis["emergency_fund"]
+    model = {
+        "summary": {
+            "income": analysis["income"],
+            "total_expenses": analysis["total_expenses"],
+            "leftover": analysis["savings_monthly"],
+            "explicit_saving": analysis["bench_now"]["explicit_saving"],
+            "effective_saving": analysis["effective_saving"],
+            "savings_rate": analysis["savings_rate"],
+        },
+        "buckets": [{"bucket": n, "current": c, "guideline": g} for n, c, g in bucket_rows(analysis)],
+        "top_categories": [{"category": c, "amount": a} for c, a in analysis["top_categories"]],
+        "emergency_fund": {"min_target": ef["min_target"], "max_target": ef["max_target"],
+                           "months_to_min": _finite(ef["months_to_min"]), "note": ef_pace_text(ef)},
+        "investment_split": [{"bucket": n, "percent": p, "amount": a}
+                             for n, p, a in sample_investment_split(analysis["effective_saving"])],
+        "tips": build_tips(analysis),
+        "disclaimer": DISCLAIMER,
+    }
+    plan = analysis.get("debt_plan")
+    if plan:
+        model["debt_plan"] = {"budget": plan["budget"], **{
+            s: {"months": _finite(plan[s]["months"]), "interest": plan[s]["interest"],
+                "payoff_order": [n for n, _ in plan[s]["payoff_order"]]} for s in DEBT_STRATEGIES}}
+    if projection:
+        model["projection"] = {
+            "paths": projection["paths"],
+            "reached_share": projection["reached_share"],
+            "months_to_target": {f"p{k}": _finite(v) for k, v in projection["months_to_target"].items()},
+            "balance_bands": {str(y): {f"p{k}": v for k, v in b.items()}
+                              for y, b in projection["balance_bands"].items()},
+        }
+    return model
+
+def report_text(model: dict, title="AI Personal Finance Assistant") -> str:
+    s = model["summary"]
+    out = [title, "=" * 60,
+           f"Monthly Income: ₹{fmt_money(s['income'])}",
+           f"Total Expenses: ₹{fmt_money(s['total_expenses'])}",
+           f"Leftover (raw): ₹{fmt_money(s['leftover'])}"]
+    if s["explicit_saving"] > 0:
+        out.append(f"User-labeled Savings/Investments: ₹{fmt_money(s['explicit_saving'])}")
+    out.append(f"Effective Monthly Saving: ₹{fmt_money(s['effective_saving'])}  (Savings Rate: {s['savings_rate']:.1f}%)")
+    out += ["", "Spending by Buckets", "-" * 60,
+            "{:<30} {:>15} {:>18}".format("Bucket", "Current (₹)", "Guideline (₹)")]
+    out += ["{:<30} {:>15} {:>18}".format(b["bucket"], fmt_money(b["current"]), fmt_money(b["guideline"])) for b in model["buckets"]]
+    out += ["", "Top Spending Categories", "-" * 60]
+    out += [f"{i}. {c['category']}: ₹{fmt_money(c['amount'])}" for i, c in enumerate(model["top_categories"], 1)]
+    ef = model["emergency_fund"]
+    out += ["", "Emergency Fund Plan", "-" * 60,
+            f"Target: ₹{fmt_money(ef['min_target'])} to ₹{fmt_money(ef['max_target'])} (≈3–6× monthly needs)", ef["note"]]
+    if "debt_plan" in model:
+        out += ["", "Debt Payoff Plan", "-" * 60]
+        for name in DEBT_STRATEGIES:
+            d = model["debt_plan"][name]
+            months = "never" if d["months"] is None else f"{d['months']:.0f} months"
+            out.append(f"{name.title()}: {months}, interest ₹{fmt_money(d['interest'])}, order {' → '.join(d['payoff_order'])}")
+    if "projection" in model:
+        pr = model["projection"]
+        out += ["", "Savings Projection (Monte Carlo)", "-" * 60,
+                f"{pr['reached_share'] * 100:.1f}% of {pr['paths']:,} paths reach the 3× needs fund; months to target: " +
+                ", ".join(f"{k.upper()} {'—' if v is None else f'{v:.0f}'}" for k, v in pr["months_to_target"].items())]
+    if model["investment_split"]:
+        out += ["", "Sample Monthly Investment Split (Educational Only)", "-" * 60]
+        out += ["{:<40} {:>7}% {:>15}".format(i["bucket"], int(i["percent"] * 100), fmt_money(i["amount"])) for i in model["investment_split"]]
+    out += ["", "Recommendations", "-" * 60]
+    out += [f"{i}. {t}" for i, t in enumerate(model["tips"], 1)]
+    out += ["", model["disclaimer"]]
+    return "\n".join(out) + "\n"
+
+def report_markdown(model: dict, title="AI Personal Finance Assistant") -> str:
+    s = model["summary"]
+    out = [f"# {title}", "",
+           f"- Monthly income: ₹{fmt_money(s['income'])}",
+           f"- Total expenses: ₹{fmt_money(s['total_expenses'])}",
+           f"- Effective monthly saving: ₹{fmt_money(s['effective_saving'])} ({s['savings_rate']:.1f}%)",
+           "", "## Spending by buckets", "", "| Bucket | Current (₹) | Guideline (₹) |", "|---|---:|---:|"]
+    out += [f"| {b['bucket']} | {fmt_money(b['current'])} | {fmt_money(b['guideline'])} |" for b in model["buckets"]]
+    out += ["", "## Top spending categories", ""]
+    out += [f"{i}. {c['category']}: ₹{fmt_money(c['amount'])}" for i, c in enumerate(model["top_categories"], 1)]
+    ef = model["emergency_fund"]
+    out += ["", "## Emergency fund", "",
+            f"Target ₹{fmt_money(ef['min_target'])} to ₹{fmt_money(ef['max_target'])}. {ef['note']}"]
+    if "debt_plan" in model:
+        out += ["", "## Debt payoff", "", "| Strategy | Months | Interest (₹) | Order |", "|---|---:|---:|---|"]
+        for name in DEBT_STRATEGIES:
+            d = model["debt_plan"][name]
+            months = "never" if d["months"] is None else f"{d['months']:.0f}"
+            out.append(f"| {name.title()} | {months} | {fmt_money(d['interest'])} | {' → '.join(d['payoff_order'])} |")
+    if "projection" in model:
+        pr = model["projection"]
+        out += ["", "## Savings projection", "",
+                f"{pr['reached_share'] * 100:.1f}% of {pr['paths']:,} simulated paths reach the 3× needs fund."]
+    out += ["", "## Recommendations", ""]
+    out += [f"{i}. {t}" for i, t in enumerate(model["tips"], 1)]
+    out += ["", f"_{model['disclaimer']}_"]
+    return "\n".join(out) + "\n"
+
+def format_report(model: dict, fmt="text") -> str:
+    if fmt == "json":
+        return json.dumps(model, ensure_ascii=False, indent=1)
+    if fmt == "markdown":
+        return report_markdown(model)
+    return report_text(model)
+
+def household_analysis(row: dict, debt_plan=True) -> dict:
+    """analyze() for one batch input row: {"id", "income", "expenses": {...} or "cat:amt, ...", "debts"?}."""
+    expenses = row.get("expenses") or {}
+    pairs = parse_expenses(expenses) if isinstance(expenses, str) else list(expenses.items())
+    analysis = analyze(float(row.get("income") or 0.0), pairs)
+    debts = parse_debts(row["debts"]) if debt_plan and row.get("debts") and np is not None else None
+    if debts:  # "," parses to no debts: no plan
+        analysis["debt_plan"] = compare_strategies(debts, analysis["bench_now"]["debt"])
+    return analysis
+
+def _report_chunk(task):
+    rows, out_dir, fmt = task
+    done, errors = 0, []
+    ready = []
+    for hid, row in rows:
+        try:
+            analysis = household_analysis(row, debt_plan=False)
+            debts = parse_debts(row["debts"]) if row.get("debts") and np is not None else None
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append((hid, str(e)))
+            continue
+        ready.append((hid, analysis, debts))
+    # Debt plans for the whole chunk in one vectorized simulation
+    with_debts = [(a, d) for _, a, d in ready if d]
+    if with_debts:
+        plans = compare_strategies_batch([d for _, d in with_debts], [a["bench_now"]["debt"] for a, _ in with_debts])
+        for (analysis, _), plan in zip(with_debts, plans):
+            analysis["debt_plan"] = plan
+    for hid, analysis, _ in ready:
+        text = format_report(report_model(analysis), fmt)
+        with open(os.path.join(out_dir, hid + REPORT_FORMATS[fmt]), "w", encoding="utf-8") as f:
+            f.write(text)
+        done += 1
+    return done, errors
+
+def read_households(path, errors=None):
+    """Yield household dicts from JSONL; malformed lines are skipped and noted in `errors`."""
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row, why = None, str(e)
+            else:
+                why = "not a JSON object"
+            if isinstance(row, dict):
+                yield row
+            elif errors is not None:
+                errors.add(f"line {n}", why)
+
+class ErrorLog:
+    """Counts failures but keeps only the first `keep` of them."""
+    def __init__(self, keep=20):
+        self.keep = keep
+        self.count = 0
+        self.first = []
+
+    def add(self, where, message):
+        self.count += 1
+        if len(self.first) < self.keep:
+            self.first.append((where, message))
+
+def report_names(rows):
+    """(file stem, row) pairs; ids are cleaned for the file system and repeats get _2, _3, ..."""
+    seen = {}
+    for i, row in enumerate(rows):
+        base = re.sub(r"[^A-Za-z0-9_.-]", "_", str(row.get("id", "")))[:64] or f"household_{i}"
+        name = base
+        while name in seen:
+            seen[base] += 1
+            name = f"{base}_{seen[base]}"
+        seen[name] = 1
+        yield name, row
+
+def generate_reports(in_path, out_dir, fmt="text", workers=1, chunk_size=256):
+    """One report file per household in a JSONL input, optionally across a process pool."""
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    errors = ErrorLog()
+    it = report_names(read_households(in_path, errors))
+    tasks = iter(lambda: (list(itertools.islice(it, chunk_size)), out_dir, fmt), None)
+    tasks = itertools.takewhile(lambda t: t[0], tasks)
+    done = 0
+    def tally(result):
+        nonlocal done
+        n, errs = result
+        done += n
+        for hid, message in errs:
+            errors.add(hid, message)
+    if workers > 1:
+        # workers write their own files, so only counts come back: collect whichever chunk
+        # finishes first and keep 2 per worker queued so a long input never piles up
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = set()
+            for task in tasks:
+                running.add(pool.submit(_report_chunk, task))
+                while len(running) >= 2 * workers:
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        tally(fut.result())
+            for fut in wait(running).done:
+                tally(fut.result())
+    else:
+        for task in tasks:
+            tally(_report_chunk(task))
+    elapsed = time.perf_counter() - start
+    return {"reports": done, "errors": errors.first, "failed": errors.count, "seconds": round(elapsed, 3),
+            "reports_per_sec": round(done / max(elapsed, 1e-9), 1)}
+
+def write_sample_households(path, n, seed=3):
+    rng = random.Random(seed)
+    cats = ["rent", "groceries", "utilities", "transport", "dining", "subscriptions", "shopping", "loan", "sip", "medical"]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            income = round(rng.uniform(20_000, 200_000), 2)
+            row = {"id": f"h{i:07d}", "income": income,
+                   "expenses": {c: round(income * rng.uniform(0.01, 0.12), 2) for c in rng.sample(cats, 7)}}
+            if rng.random() < 0.3:
+                row["debts"] = f"card:{rng.randint(5, 200) * 1000}@{rng.uniform(18, 40):.1f}%/{rng.randint(1, 9) * 500}"
+            f.write(json.dumps(row) + "\n")
+
+def startup_seconds(with_rich=False, runs=3) -> float:
+    """Best-of-N wall time for a fresh interpreter to load this script (optionally plus rich)."""
+    code = f"import runpy; m = runpy.run_path({os.path.abspath(__file__)!r})"
+    if with_rich:
+        code += "; m['enable_rich']()"
+    best = math.inf
+    for _ in range(runs):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        best = min(best, time.perf_counter() - t)
+    return round(best, 3)
+
+def benchmark_reports(households=5_000, workers=1, formats=("text", "markdown", "json")):
+    """Startup cost and reports/s per format, with a rich console render for comparison."""
+    report = {"households": households, "workers": workers,
+              "startup_headless_s": startup_seconds(False), "startup_with_rich_s": startup_seconds(True)}
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "households.jsonl")
+        write_sample_households(src, households)
+        for fmt in formats:
+            r = generate_reports(src, os.path.join(tmp, fmt), fmt, workers)
+            report[f"{fmt}_reports_per_sec"] = r["reports_per_sec"]
+        if enable_rich():
+            global console
+            rows = list(itertools.islice(read_households(src), 500))
+            saved, console = console, type(console)(file=io.StringIO(), width=100)
+            try:
+                t = time.perf_counter()
+                for row in rows:
+                    render_report(household_analysis(row))
+                report["rich_reports_per_sec"] = round(len(rows) / (time.perf_counter() - t), 1)
+            finally:
+                console = saved
+    return report
 
 # -----------------------------
 # Input handling
@@ -336,10 +1143,537 @@ def parse_expenses(raw: str):
         items.append((cat, amt))
     return items
 
+_DEBT_PAT = re.compile(r"^\s*([^:]+?)\s*:\s*([\d.,]+)\s*@\s*([\d.]+)\s*%?\s*/\s*([\d.,]+)\s*$")
+
+def parse_debts(raw: str):
+    """
+    Parse comma-separated 'name:balance@apr%/minimum' debts.
+    Example: card:60000@36%/3000, car:250000@9.5%/7000
+    """
+    debts = []
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        m = _DEBT_PAT.match(part.replace("_", ""))
+        if not m:
+            raise ValueError(f"can't read debt {part.strip()!r}; use name:balance@apr%/minimum")
+        name, bal, apr, minimum = m.groups()
+        debts.append((name.title(), float(bal.replace(",", "")), float(apr), float(minimum.replace(",", ""))))
+    return debts
+
+# -----------------------------
+# Statement ingestion (CSV / OFX, streamed)
+# -----------------------------
+DATE_COLUMNS = ("date", "transaction date", "txn date", "posting date", "posted", "value date")
+CATEGORY_COLUMNS = ("category",)
+DESCRIPTION_COLUMNS = ("description", "merchant", "payee", "narration", "details", "particulars", "memo", "name")
+AMOUNT_COLUMNS = ("amount", "transaction amount", "value")
+DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals", "debit amount", "paid out")
+CREDIT_COLUMNS = ("credit", "deposit", "deposits", "credit amount", "paid in")
+TYPE_COLUMNS = ("type", "dr/cr", "cr/dr", "transaction type")
+# only these values flip an amount's sign; other "type" values ("Card payment", "Deposit") keep it
+DEBIT_MARKERS = frozenset({"dr", "debit", "d"})
+CREDIT_MARKERS = frozenset({"cr", "credit", "c"})
+
+def parse_amount(raw) -> float:
+    s = str(raw).strip().replace(",", "").replace("₹", "").replace("$", "").replace(" ", "")
+    if not s:
+        return 0.0
+    neg = s.startswith("(") and s.endswith(")")
+    s = s.strip("()")
+    if s.endswith("-"):
+        neg, s = True, s[:-1]
+    try:
+        v = float(s)
+    except ValueError:
+        return 0.0
+    return -abs(v) if neg else v
+
+_ISO_DATE = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+_DMY_DATE = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})")
+
+@lru_cache(maxsize=65536)
+def parse_date(raw: str):
+    """ISO (2024-03-31), OFX (20240331...) or day-first (31/03/2024) dates; None if unreadable."""
+    s = raw.strip()
+    try:
+        m = _ISO_DATE.match(s)
+        if m:
+            return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        m = _DMY_DATE.match(s)
+        if m:
+            y = int(m.group(3))
+            return datetime.date(y + 2000 if y < 100 else y, int(m.group(2)), int(m.group(1)))
+    except ValueError:
+        pass
+    return None
+
+_REF_NOISE = re.compile(r"[^a-z&' ]+")
+
+@lru_cache(maxsize=65536)
+def normalize_description(desc: str) -> str:
+    # "UPI/4021XX/SWIGGY*ORDER 1234" -> "Upi Swiggy Order": drop reference numbers so merchants group together
+    words = _REF_NOISE.sub(" ", desc.lower()).split()
+    return " ".join(words[:4]).title() or "Other"
+
+def _pick(header, names):
+    for i, h in enumerate(header):
+        if h in names:
+            return i
+    return None
+
+def iter_csv_transactions(path):
+    """Yield (date_str, category, signed_amount) rows; money out is negative."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        i_date = _pick(header, DATE_COLUMNS)
+        i_cat = _pick(header, CATEGORY_COLUMNS)
+        i_desc = _pick(header, DESCRIPTION_COLUMNS)
+        i_amt = _pick(header, AMOUNT_COLUMNS)
+        i_deb = _pick(header, DEBIT_COLUMNS)
+        i_cred = _pick(header, CREDIT_COLUMNS)
+        i_type = _pick(header, TYPE_COLUMNS)
+        if i_amt is None and i_deb is None and i_cred is None:
+            raise ValueError(f"{path}: no amount/debit/credit column in header {header}")
+        # debit/credit cells may be missing at the end of a row; every other column must be there
+        needed = max(i for i in (i_date, i_cat, i_desc, i_amt, i_type, -1) if i is not None)
+        for row in reader:
+            if not row or len(row) <= needed:
+                continue  # blank line, or a short trailer like "Total,,"
+            if i_cat is not None and row[i_cat].strip():
+                cat = row[i_cat]
+            elif i_desc is not None:
+                cat = normalize_description(row[i_desc])
+            else:
+                cat = "Other"
+            if i_amt is not None:
+                amt = parse_amount(row[i_amt])
+                if i_type is not None:
+                    kind = row[i_type].strip().lower().rstrip(".")
+                    if kind in DEBIT_MARKERS:
+                        amt = -abs(amt)
+                    elif kind in CREDIT_MARKERS:
+                        amt = abs(amt)
+            else:
+                amt = (parse_amount(row[i_cred]) if i_cred is not None and i_cred < len(row) else 0.0) \
+                    - (parse_amount(row[i_deb]) if i_deb is not None and i_deb < len(row) else 0.0)
+            yield (row[i_date] if i_date is not None else ""), cat, amt
+
+_OFX_FIELD = re.compile(r"<(TRNAMT|NAME|MEMO|DTPOSTED)>([^<\r\n]*)", re.I)
+_OFX_TXN = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.I | re.S)
+
+def iter_ofx_transactions(path, block_size=1 << 20):
+    """Yield (date_str, category, signed_amount) from <STMTTRN> blocks, reading the file in blocks."""
+    buf = ""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            data = f.read(block_size)
+            buf += data
+            pos = 0
+            for m in _OFX_TXN.finditer(buf):
+                pos = m.end()
+                fields = {k.upper(): v.strip() for k, v in _OFX_FIELD.findall(m.group(1))}
+                if "TRNAMT" in fields:
+                    cat = normalize_description(fields.get("NAME") or fields.get("MEMO") or "Other")
+                    yield fields.get("DTPOSTED", "")[:8], cat, parse_amount(fields["TRNAMT"])
+            if not data:
+                return
+            # carry over only the unfinished tail (an open <STMTTRN> split across blocks)
+            buf = buf[pos:]
+            if len(buf) > block_size:
+                start = buf.upper().rfind("<STMTTRN>")
+                # no open block: keep just enough to finish a tag split across the read
+                buf = buf[start:] if start >= 0 else buf[-(len("<STMTTRN>") - 1):]
+
+def iter_transactions(path, fmt=None):
+    fmt = fmt or ("ofx" if path.lower().endswith((".ofx", ".qfx")) else "csv")
+    return iter_ofx_transactions(path) if fmt == "ofx" else iter_csv_transactions(path)
+
+def ingest_statement(path, fmt=None, chunk_size=50_000, max_categories=50_000):
+    """
+    Stream a bank statement into by_category/by_bucket totals without loading the file.
+    Money out counts as spending; money in is summed as credits. Past `max_categories`
+    distinct names, new ones are folded into 'Other' so memory stays bounded.
+    """
+    start = time.perf_counter()
+    by_category = defaultdict(float)
+    months = set()
+    rows = spend_rows = 0
+    credits = 0.0
+    it = iter_transactions(path, fmt)
+    while True:
+        chunk = list(itertools.islice(it, chunk_size))
+        if not chunk:
+            break
+        rows += len(chunk)
+        for date_str, cat, amt in chunk:
+            d = parse_date(date_str) if date_str else None
+            if d is not None:
+                months.add((d.year, d.month))
+            if amt < 0:
+                key = cat.strip().title()
+                if key not in by_category and len(by_category) >= max_categories:
+                    key = "Other"
+                by_category[key] += -amt
+                spend_rows += 1
+            else:
+                credits += amt
+    elapsed = time.perf_counter() - start
+    return {
+        "by_category": dict(by_category),
+        "by_bucket": dict(bucket_totals(by_category)),
+        "rows": rows,
+        "spend_rows": spend_rows,
+        "credits": credits,
+        "months": max(1, len(months)),
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else float("inf"),
+    }
+
+def monthly_analysis(ingested: dict, income: float | None = None):
+    """analyze_categories() on monthly averages of an ingested statement."""
+    n = ingested["months"]
+    if income is None:
+        income = ingested["credits"] / n
+    return analyze_categories(income, {c: v / n for c, v in ingested["by_category"].items()})
+
+# -----------------------------
+# Transaction store (numpy columns + sorted indexes)
+# -----------------------------
+EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+def to_day(d) -> int:
+    return (d if isinstance(d, datetime.date) else parse_date(str(d))).toordinal() - EPOCH
+
+def from_day(day: int) -> datetime.date:
+    return datetime.date.fromordinal(int(day) + EPOCH)
+
+class TransactionStore:
+    """
+    Transactions as three aligned columns sorted by date: day (int32, days since 1970),
+    amount (float64, money out negative) and cat (int32 id into `categories`).
+    A second permutation orders rows by (category, day), so a category's date range is
+    two binary searches; totals use bincount over the selected slice.
+    """
+    INDEX_COLUMNS = ("by_cat", "by_cat_day", "cat_starts")
+
+    def __init__(self, day, amount, cat, categories, by_cat=None, by_cat_day=None, cat_starts=None):
+        self.day, self.amount, self.cat = day, amount, cat
+        self.categories = list(categories)
+        self.bucket_names = list(dict.fromkeys(CLASSIFIER.buckets + [CLASSIFIER.default]))
+        bidx = {b: i for i, b in enumerate(self.bucket_names)}
+        self.cat_bucket = np.array([bidx[bucket_for(c)] for c in self.categories], dtype=np.int32)
+        # rows are date-sorted, so a stable sort on cat keeps dates ascending within each category
+        # saved stores bring all three, so load() never gathers over the mapped columns
+        self.by_cat = np.argsort(cat, kind="stable").astype(np.int64) if by_cat is None else by_cat
+        self.by_cat_day = self.day[self.by_cat] if by_cat_day is None else by_cat_day
+        if cat_starts is None:
+            cat_starts = np.searchsorted(self.cat[self.by_cat], np.arange(len(self.categories) + 1))
+        self.cat_starts = cat_starts
+
+    def __len__(self):
+        return len(self.day)
+
+    @classmethod
+    def from_transactions(cls, rows):
+        """Build from (date_str, category, signed_amount) rows; rows without a readable date are skipped."""
+        day, amount, cat = array.array("i"), array.array("d"), array.array("i")
+        ids = {}
+        for date_str, category, amt in rows:
+            d = parse_date(date_str) if date_str else None
+            if d is None:
+                continue
+            key = category.strip().title()
+            cid = ids.get(key)
+            if cid is None:
+                cid = ids[key] = len(ids)
+            day.append(d.toordinal() - EPOCH)
+            amount.append(amt)
+            cat.append(cid)
+        day = np.frombuffer(day, dtype=np.int32)
+        order = np.argsort(day, kind="stable")
+        return cls(day[order], np.frombuffer(amount, dtype=np.float64)[order],
+                   np.frombuffer(cat, dtype=np.int32)[order], list(ids))
+
+    @classmethod
+    def from_statement(cls, path, fmt=None):
+        return cls.from_transactions(iter_transactions(path, fmt))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ("day", "amount", "cat") + self.INDEX_COLUMNS:
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+        with open(os.path.join(directory, "categories.json"), "w", encoding="utf-8") as f:
+            json.dump(self.categories, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved store; with mmap the columns are paged in on demand."""
+        mode = "r" if mmap else None
+        cols = {}
+        for n in ("day", "amount", "cat") + cls.INDEX_COLUMNS:
+            path = os.path.join(directory, n + ".npy")
+            if os.path.exists(path) or n not in cls.INDEX_COLUMNS[1:]:  # older stores lack the derived indexes
+                cols[n] = np.load(path, mmap_mode=mode)
+        with open(os.path.join(directory, "categories.json"), encoding="utf-8") as f:
+            categories = json.load(f)
+        return cls(cols.pop("day"), cols.pop("amount"), cols.pop("cat"), categories, **cols)
+
+    def _span(self, start, end):
+        # [start, end) as a slice of the date-sorted rows
+        lo = 0 if start is None else np.searchsorted(self.day, to_day(start), "left")
+        hi = len(self.day) if end is None else np.searchsorted(self.day, to_day(end), "left")
+        return slice(int(lo), int(hi))
+
+    def match_categories(self, text: str) -> list[int]:
+        """Ids of categories whose name contains `text` (case-insensitive)."""
+        t = text.strip().lower()
+        return [i for i, c in enumerate(self.categories) if t in c.lower()]
+
+    def rows(self, category=None, start=None, end=None, bucket=None):
+        """Row positions in [start, end) for a category name/substring and/or bucket, in date order."""
+        if category is None:
+            sl = self._span(start, end)
+            idx = np.arange(sl.start, sl.stop)
+        else:
+            parts = []
+            lo_day = None if start is None else to_day(start)
+            hi_day = None if end is None else to_day(end)
+            for c in self.match_categories(category):
+                a, b = int(self.cat_starts[c]), int(self.cat_starts[c + 1])
+                days = self.by_cat_day[a:b]
+                lo = a + (0 if lo_day is None else int(np.searchsorted(days, lo_day, "left")))
+                hi = a + (b - a if hi_day is None else int(np.searchsorted(days, hi_day, "left")))
+                parts.append(self.by_cat[lo:hi])
+            idx = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        if bucket is not None:
+            idx = idx[self.cat_bucket[self.cat[idx]] == self.bucket_names.index(bucket)]
+        return idx
+
+    def records(self, idx):
+        return [(from_day(self.day[i]).isoformat(), self.categories[self.cat[i]], float(self.amount[i])) for i in idx]
+
+    def spend_by_category(self, start=None, end=None) -> dict:
+        """Money out per category over [start, end)."""
+        sl = self._span(start, end)
+        spend = np.maximum(-self.amount[sl], 0.0)
+        totals = np.bincount(self.cat[sl], weights=spend, minlength=len(self.categories))
+        return {self.categories[i]: float(totals[i]) for i in np.flatnonzero(totals)}
+
+    def spend_by_bucket(self, start=None, end=None) -> dict:
+        sl = self._span(start, end)
+        spend = np.maximum(-self.amount[sl], 0.0)
+        totals = np.bincount(self.cat_bucket[self.cat[sl]], weights=spend, minlength=len(self.bucket_names))
+        return {self.bucket_names[i]: float(totals[i]) for i in np.flatnonzero(totals)}
+
+    def largest(self, n=10, bucket=None, category=None, start=None, end=None):
+        """The n biggest outflows in the range, optionally within a bucket or category."""
+        if n <= 0:
+            return []
+        idx = self.rows(category, start, end, bucket)
+        spend = -self.amount[idx]
+        if len(idx) > n:
+            top = np.argpartition(spend, -n)[-n:]
+            idx, spend = idx[top], spend[top]
+        order = np.argsort(-spend, kind="stable")
+        return self.records(idx[order][spend[order] > 0])
+
+def period_bounds(text: str):
+    """'2024-03' -> month, '2024-Q1' -> quarter, '2024' -> year, as (start, end) dates."""
+    m = re.fullmatch(r"(\d{4})(?:-(?:(\d{1,2})|[Qq]([1-4])))?", text.strip())
+    if not m:
+        raise ValueError(f"bad period {text!r}; use YYYY, YYYY-MM or YYYY-Qn")
+    y = int(m.group(1))
+    if m.group(2):
+        first, months = int(m.group(2)), 1
+    elif m.group(3):
+        first, months = 3 * int(m.group(3)) - 2, 3
+    else:
+        first, months = 1, 12
+    end = first + months
+    return datetime.date(y, first, 1), datetime.date(y + (end - 1) // 12, (end - 1) % 12 + 1, 1)
+
+# -----------------------------
+# Monthly history (SQLite, incremental rollups)
+# -----------------------------
+HISTORY_DB_PATH = os.environ.get("FINANCE_HISTORY_DB", "finance_history.db")
+ROLLING_WINDOWS = (3, 6, 12)
+
+def month_seq(month: str) -> int:
+    # "2024-03" -> running month number, so windows are calendar months
+    y, m = month.split("-")[:2]
+    if not 1 <= int(m) <= 12:
+        raise ValueError(f"bad month: {month!r}")
+    return int(y) * 12 + int(m) - 1
+
+def seq_month(seq: int) -> str:
+    return f"{seq // 12:04d}-{seq % 12 + 1:02d}"
+
+def history_values(analysis: dict) -> list[tuple[str, str, float]]:
+    """(kind, name, amount) rows stored per month: headline totals, buckets and categories."""
+    rows = [("total", k, float(analysis[k])) for k in ("income", "total_expenses", "effective_saving")]
+    rows += [("bucket", b, float(v)) for b, v in analysis["by_bucket"].items()]
+    rows += [("category", c, float(v)) for c, v in analysis["by_category"].items()]
+    return rows
+
+class FinanceHistory:
+    """
+    Per-user monthly values plus rolling 3/6/12-month sums and year-to-date totals.
+    Months are appended in order; each append adds the new values and subtracts
+    the months leaving each window, touching O(categories) rows instead of
+    rescanning history. Missing months count as zero.
+    """
+    def __init__(self, path=HISTORY_DB_PATH, windows=ROLLING_WINDOWS):
+        self.path = path
+        self.windows = tuple(windows)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS month_values (
+                user TEXT NOT NULL, seq INTEGER NOT NULL, kind TEXT NOT NULL,
+                name TEXT NOT NULL, amount REAL NOT NULL,
+                PRIMARY KEY (user, kind, name, seq)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS month_values_seq ON month_values (user, seq);
+            CREATE TABLE IF NOT EXISTS months (
+                user TEXT NOT NULL, seq INTEGER NOT NULL, PRIMARY KEY (user, seq)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rollups (
+                user TEXT NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL,
+                window INTEGER NOT NULL, total REAL NOT NULL,
+                PRIMARY KEY (user, window, kind, name)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ytd (
+                user TEXT NOT NULL, year INTEGER NOT NULL, kind TEXT NOT NULL,
+                name TEXT NOT NULL, total REAL NOT NULL,
+                PRIMARY KEY (user, year, kind, name)) WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def _span(self, user):
+        return self.conn.execute("SELECT MIN(seq), MAX(seq) FROM months WHERE user = ?", (user,)).fetchone()
+
+    def record(self, month: str, analysis: dict, user="default"):
+        """Append (or replace the latest) month for `user`."""
+        self.record_values(month, history_values(analysis), user)
+
+    def record_values(self, month, values, user="default"):
+        seq = month_seq(month)
+        year = seq // 12
+        cur = self.conn.cursor()
+        with self.conn:
+            first, last = self._span(user)
+            if last is not None and seq < last:
+                raise ValueError(f"months must be appended in order; latest is {seq_month(last)}")
+            if last == seq:
+                # Re-recording the latest month: back out its old values first
+                old = cur.execute("SELECT kind, name, amount FROM month_values WHERE user = ? AND seq = ?",
+                                  (user, seq)).fetchall()
+                for w in self.windows:
+                    cur.executemany("UPDATE rollups SET total = total - ? WHERE user = ? AND window = ? AND kind = ? AND name = ?",
+                                    [(a, user, w, k, n) for k, n, a in old])
+                cur.executemany("UPDATE ytd SET total = total - ? WHERE user = ? AND year = ? AND kind = ? AND name = ?",
+                                [(a, user, year, k, n) for k, n, a in old])
+                cur.execute("DELETE FROM month_values WHERE user = ? AND seq = ?", (user, seq))
+            prev = seq if last is None else last
+            for w in self.windows:
+                # Months (prev - w, seq - w] slide out of the window
+                gone = cur.execute("""SELECT kind, name, SUM(amount) FROM month_values
+                                      WHERE user = ? AND seq > ? AND seq <= ? GROUP BY kind, name""",
+                                   (user, prev - w, seq - w)).fetchall()
+                cur.executemany("UPDATE rollups SET total = total - ? WHERE user = ? AND window = ? AND kind = ? AND name = ?",
+                                [(a, user, w, k, n) for k, n, a in gone])
+                cur.executemany("""INSERT INTO rollups (user, kind, name, window, total) VALUES (?, ?, ?, ?, ?)
+                                   ON CONFLICT (user, window, kind, name) DO UPDATE SET total = total + excluded.total""",
+                                [(user, k, n, w, a) for k, n, a in values])
+            cur.executemany("""INSERT INTO ytd (user, year, kind, name, total) VALUES (?, ?, ?, ?, ?)
+                               ON CONFLICT (user, year, kind, name) DO UPDATE SET total = total + excluded.total""",
+                            [(user, year, k, n, a) for k, n, a in values])
+            cur.executemany("INSERT INTO month_values (user, seq, kind, name, amount) VALUES (?, ?, ?, ?, ?)",
+                            [(user, seq, k, n, a) for k, n, a in values])
+            cur.execute("INSERT OR IGNORE INTO months (user, seq) VALUES (?, ?)", (user, seq))
+
+    def rolling(self, window=3, kind="bucket", user="default") -> dict:
+        """Average per month over the last `window` months (fewer if history is shorter)."""
+        first, last = self._span(user)
+        if last is None:
+            return {}
+        span = min(window, last - first + 1)
+        rows = self.conn.execute("SELECT name, total FROM rollups WHERE user = ? AND window = ? AND kind = ?",
+                                 (user, window, kind)).fetchall()
+        return {n: t / span for n, t in rows if abs(t) > 1e-9}
+
+    def ytd(self, year=None, kind="bucket", user="default") -> dict:
+        if year is None:
+            last = self._span(user)[1]
+            if last is None:
+                return {}
+            year = last // 12
+        rows = self.conn.execute("SELECT name, total FROM ytd WHERE user = ? AND year = ? AND kind = ?",
+                                 (user, year, kind)).fetchall()
+        return dict(rows)
+
+    def trend(self, name, kind="bucket", months=12, user="default") -> list[tuple[str, float]]:
+        """Month-by-month values for one bucket/category over the latest `months` months."""
+        last = self._span(user)[1]
+        if last is None:
+            return []
+        rows = dict(self.conn.execute("""SELECT seq, amount FROM month_values
+                                         WHERE user = ? AND kind = ? AND name = ? AND seq > ? AND seq <= ?""",
+                                      (user, kind, name, last - months, last)).fetchall())
+        return [(seq_month(q), rows.get(q, 0.0)) for q in range(last - months + 1, last + 1)]
+
+def render_history(history: FinanceHistory, user="default"):
+    hr("History (rolling averages per month)")
+    avgs = {w: history.rolling(w, "bucket", user) for w in history.windows}
+    names = sorted(set().union(*avgs.values()))
+    print("{:<22}".format("Bucket") + "".join("{:>16}".format(f"{w}-mo avg (₹)") for w in history.windows))
+    for n in names:
+        print("{:<22}".format(n) + "".join("{:>16}".format(fmt_money(avgs[w].get(n, 0.0))) for w in history.windows))
+    ytd = history.ytd(kind="total", user=user)
+    if ytd:
+        cprint(f"Year to date: income ₹{fmt_money(ytd.get('income', 0.0))}, "
+               f"expenses ₹{fmt_money(ytd.get('total_expenses', 0.0))}, "
+               f"saved ₹{fmt_money(ytd.get('effective_saving', 0.0))}")
+
+def benchmark_history(path, users=100, years=30, seed=5):
+    """Fill `users` × `years` of synthetic months, then time append and trend/rollup queries (ms)."""
+    rng = random.Random(seed)
+    cats = ["Rent", "Groceries", "Utilities", "Dining", "Subscriptions", "EMI", "SIP", "Travel"]
+    history = FinanceHistory(path)
+    t = time.perf_counter()
+    months = 0
+    for u in range(users):
+        income = rng.uniform(30_000, 200_000)
+        for seq in range(2000 * 12, 2000 * 12 + years * 12):
+            pairs = [(c, income * rng.uniform(0.02, 0.15)) for c in cats]
+            history.record(seq_month(seq), analyze(income, pairs), user=f"u{u}")
+            months += 1
+    fill_s = time.perf_counter() - t
+
+    def timed(fn, n=200):
+        t = time.perf_counter()
+        for i in range(n):
+            fn(f"u{rng.randrange(users)}")
+        return round((time.perf_counter() - t) / n * 1000, 3)
+    report = {
+        "users": users,
+        "months": months,
+        "append_ms": round(fill_s / months * 1000, 3),
+        "trend_12_ms": timed(lambda u: history.trend("Wants", months=12, user=u)),
+        "trend_120_ms": timed(lambda u: history.trend("Dining", kind="category", months=120, user=u)),
+        "rolling_ms": timed(lambda u: history.rolling(12, user=u)),
+        "ytd_ms": timed(lambda u: history.ytd(user=u)),
+    }
+    history.close()
+    return report
+
 # -----------------------------
 # Main
 # -----------------------------
 def main():
+    enable_rich()
     # Heading
     if USE_RICH:
         console.print(Panel.fit("🧮 AI Personal Finance Assistant", style="bold green"))
@@ -359,7 +1693,134 @@ def main():
 
     expenses = parse_expenses(exp_raw)
     analysis = analyze(income, expenses)
-    render_report(analysis)
+    debt_raw = input(
+        "Optional: list debts as 'name:balance@apr%/minimum', comma-separated (blank to skip)\n"
+        "e.g. card:60000@36%/3000, car:250000@9.5%/7000\n> "
+    ).strip()
+    if debt_raw and np is not None:
+        try:
+            debts = parse_debts(debt_raw)
+            # Budget: what the user already spends on debt, at least the minimums
+            if debts:
+                analysis["debt_plan"] = compare_strategies(debts, analysis["bench_now"]["debt"])
+        except ValueError as e:
+            cprint(f"Skipping debt plan: {e}")
+    projection = project_savings(analysis, paths=20_000, years=10) if np is not None and income > 0 else None
+    render_report(analysis, projection)
+
+    # Optional: keep this month in the local history for trends
+    month = input("Save to history as month YYYY-MM (blank to skip): ").strip()
+    if month:
+        history = FinanceHistory()
+        try:
+            history.record(month, analysis)
+            render_history(history)
+        except ValueError as e:
+            cprint(f"Not saved: {e}")
+        finally:
+            history.close()
+
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(prog="finance-assistant")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="analyze a CSV/OFX bank statement")
+    p.add_argument("statement")
+    p.add_argument("--format", choices=["csv", "ofx"])
+    p.add_argument("--income", type=float, help="monthly income (default: average monthly credits)")
+    p.add_argument("--chunk-size", type=int, default=50_000)
+    p.add_argument("--rules", help="JSON/CSV keyword file for bucket classification")
+    p = sub.add_parser("bench-batch", help="time the vectorized many-household analysis")
+    p.add_argument("--households", type=int, default=1_000_000)
+    p = sub.add_parser("history", help="rolling averages and year-to-date from the history store")
+    p.add_argument("--db", default=HISTORY_DB_PATH)
+    p.add_argument("--user", default="default")
+    p = sub.add_parser("bench-history", help="time history appends and trend queries")
+    p.add_argument("db")
+    p.add_argument("--users", type=int, default=100)
+    p.add_argument("--years", type=int, default=30)
+    p = sub.add_parser("project", help="Monte Carlo emergency-fund projection")
+    p.add_argument("--income", type=float, required=True)
+    p.add_argument("--expenses", required=True, help="'category:amount' pairs, comma-separated")
+    p.add_argument("--paths", type=int, default=100_000)
+    p.add_argument("--years", type=int, default=30)
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--seed", type=int)
+    p = sub.add_parser("debts", help="compare avalanche and snowball payoff")
+    p.add_argument("debts", help="'name:balance@apr%%/minimum' debts, comma-separated")
+    p.add_argument("--budget", type=float, default=0.0, help="monthly debt budget (default: sum of minimums)")
+    p = sub.add_parser("reports", help="write one report per household from a JSONL file")
+    p.add_argument("households")
+    p.add_argument("out_dir")
+    p.add_argument("--format", choices=list(REPORT_FORMATS), default="text")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p = sub.add_parser("bench-reports", help="startup time and reports per second")
+    p.add_argument("--households", type=int, default=5_000)
+    p.add_argument("--workers", type=int, default=1)
+    p = sub.add_parser("store", help="build an indexed transaction store from a statement")
+    p.add_argument("statement")
+    p.add_argument("store_dir")
+    p.add_argument("--format", choices=["csv", "ofx"])
+    p = sub.add_parser("query", help="range/group-by queries on a transaction store")
+    p.add_argument("store_dir")
+    p.add_argument("--period", help="YYYY, YYYY-MM or YYYY-Qn")
+    p.add_argument("--category", help="category name or part of it")
+    p.add_argument("--bucket", choices=[b for b, _ in DEFAULT_RULES])
+    p.add_argument("--largest", type=int, metavar="N", help="show the N biggest outflows")
+    p.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+    if args.command not in ("reports", "bench-reports", "bench-batch", "bench-history", "query"):
+        enable_rich()
+    if getattr(args, "rules", None):
+        use_rules_file(args.rules)
+    if args.command == "ingest":
+        ingested = ingest_statement(args.statement, args.format, args.chunk_size)
+        render_report(monthly_analysis(ingested, args.income))
+        cprint(f"Ingested {ingested['rows']:,} rows over {ingested['months']} month(s) "
+               f"in {ingested['seconds']:.2f}s ({ingested['rows_per_sec']:,.0f} rows/s)")
+    elif args.command == "bench-batch":
+        print(json.dumps(benchmark_batch(args.households), indent=2))
+    elif args.command == "project":
+        analysis = analyze(args.income, parse_expenses(args.expenses))
+        projection = project_savings(analysis, args.paths, args.years, args.seed, args.workers)
+        render_projection(projection)
+        cprint(f"Simulated {args.paths:,} paths × {args.years * 12} months in {projection['seconds']:.2f}s")
+    elif args.command == "debts":
+        render_debt_plan(compare_strategies(parse_debts(args.debts), args.budget))
+    elif args.command == "reports":
+        print(json.dumps(generate_reports(args.households, args.out_dir, args.format, args.workers), indent=2))
+    elif args.command == "bench-reports":
+        print(json.dumps(benchmark_reports(args.households, args.workers), indent=2))
+    elif args.command == "store":
+        t = time.perf_counter()
+        store = TransactionStore.from_statement(args.statement, args.format)
+        store.save(args.store_dir)
+        cprint(f"Stored {len(store):,} transactions in {len(store.categories):,} categories "
+               f"in {time.perf_counter() - t:.2f}s")
+    elif args.command == "query":
+        store = TransactionStore.load(args.store_dir)
+        start, end = period_bounds(args.period) if args.period else (None, None)
+        t = time.perf_counter()
+        if args.largest:
+            rows = store.largest(args.largest, args.bucket, args.category, start, end)
+        elif args.category or args.bucket:
+            rows = store.records(store.rows(args.category, start, end, args.bucket)[:args.limit])
+        else:
+            rows = sorted(store.spend_by_bucket(start, end).items(), key=lambda x: -x[1])
+        ms = (time.perf_counter() - t) * 1000
+        for row in rows:
+            print("  ".join(fmt_money(v) if isinstance(v, float) else str(v) for v in row))
+        cprint(f"{len(rows)} row(s) in {ms:.2f} ms")
+    elif args.command == "history":
+        history = FinanceHistory(args.db)
+        render_history(history, args.user)
+        history.close()
+    elif args.command == "bench-history":
+        print(json.dumps(benchmark_history(args.db, args.users, args.years), indent=2))
+
+CLI_COMMANDS = ("ingest", "bench-batch", "project", "debts", "reports", "bench-reports", "store", "query", "history", "bench-history")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        run_command_line(sys.argv[1:])
+    else:
+        main()
@@ -1,5 +1,5 @@
 # Travel Planner (single Jupyter cell)
-import random, datetime, os, urllib.parse
+import random, datetime, os, sys, math, json, time, bisect, argparse, urllib.parse
 from IPython.display import display, HTML
 try:
     import ipywidgets as widgets
@@ -12,82 +12,259 @@ except Exception:
 # -------------------------
 ATTRACTIONS = {
     "Paris": [
-        {"name":"Eiffel Tower","category":"landmark","hours":2,"cost":30,"note":"Iconic view; book tickets early."},
-        {"name":"Louvre Museum","category":"culture","hours":3,"cost":17,"note":"World-class art collection."},
-        {"name":"Musée d'Orsay","category":"culture","hours":2.5,"cost":16,"note":"Impressionist masterpieces."},
-        {"name":"Montmartre & Sacré-Cœur","category":"culture","hours":2.5,"cost":0,"note":"Bohemian hilltop neighborhood."},
-        {"name":"Seine River Cruise","category":"relax","hours":1.5,"cost":15,"note":"Great for evening views."},
-        {"name":"Le Marais (food & shopping)","category":"food","hours":2,"cost":20,"note":"Boutiques & cafes."},
-        {"name":"Versailles (day trip)","category":"culture","hours":6,"cost":25,"note":"Palace + gardens; allow a full day."}
+        {"name":"Eiffel Tower","category":"landmark","hours":2,"cost":30,"lat":48.8584,"lon":2.2945,"note":"Iconic view; book tickets early."},
+        {"name":"Louvre Museum","category":"culture","hours":3,"cost":17,"lat":48.8606,"lon":2.3376,"note":"World-class art collection."},
+        {"name":"Musée d'Orsay","category":"culture","hours":2.5,"cost":16,"lat":48.86,"lon":2.3266,"note":"Impressionist masterpieces."},
+        {"name":"Montmartre & Sacré-Cœur","category":"culture","hours":2.5,"cost":0,"lat":48.8867,"lon":2.3431,"note":"Bohemian hilltop neighborhood."},
+        {"name":"Seine River Cruise","category":"relax","hours":1.5,"cost":15,"lat":48.8599,"lon":2.2931,"note":"Great for evening views."},
+        {"name":"Le Marais (food & shopping)","category":"food","hours":2,"cost":20,"lat":48.859,"lon":2.362,"note":"Boutiques & cafes."},
+        {"name":"Versailles (day trip)","category":"culture","hours":6,"cost":25,"lat":48.8049,"lon":2.1204,"note":"Palace + gardens; allow a full day."}
     ],
     "New York": [
-        {"name":"Central Park","category":"nature","hours":2.5,"cost":0,"note":"Relax, walk or bike."},
-        {"name":"Metropolitan Museum of Art (The Met)","category":"culture","hours":3,"cost":25,"note":"Large museum; pick highlights."},
-        {"name":"Times Square","category":"landmark","hours":1.5,"cost":0,"note":"Busy, vibrant at night."},
-        {"name":"Statue of Liberty (ferry)","category":"landmark","hours":3.5,"cost":25,"note":"Reserve ferry time."},
-        {"name":"Brooklyn Bridge & DUMBO","category":"landmark","hours":2,"cost":0,"note":"Great skyline views."},
-        {"name":"9/11 Memorial & Museum","category":"culture","hours":2,"cost":26,"note":"Powerful memorial."}
+        {"name":"Central Park","category":"nature","hours":2.5,"cost":0,"lat":40.7812,"lon":-73.9665,"note":"Relax, walk or bike."},
+        {"name":"Metropolitan Museum of Art (The Met)","category":"culture","hours":3,"cost":25,"lat":40.7794,"lon":-73.9632,"note":"Large museum; pick highlights."},
+        {"name":"Times Square","category":"landmark","hours":1.5,"cost":0,"lat":40.758,"lon":-73.9855,"note":"Busy, vibrant at night."},
+        {"name":"Statue of Liberty (ferry)","category":"landmark","hours":3.5,"cost":25,"lat":40.6892,"lon":-74.0445,"note":"Reserve ferry time."},
+        {"name":"Brooklyn Bridge & DUMBO","category":"landmark","hours":2,"cost":0,"lat":40.7033,"lon":-73.9881,"note":"Great skyline views."},
+        {"name":"9/11 Memorial & Museum","category":"culture","hours":2,"cost":26,"lat":40.7115,"lon":-74.0134,"note":"Powerful memorial."}
     ],
     "Tokyo": [
-        {"name":"Senso-ji Temple (Asakusa)","category":"culture","hours":1.5,"cost":0,"note":"Historic temple and market street."},
-        {"name":"Meiji Shrine & Harajuku","category":"culture","hours":2,"cost":0,"note":"Shrine plus trendy neighborhood."},
-        {"name":"Shibuya Crossing & Center Gai","category":"landmark","hours":1.5,"cost":0,"note":"Iconic intersection and shopping."},
-        {"name":"Tokyo Skytree","category":"landmark","hours":2,"cost":20,"note":"Observation decks."},
-        {"name":"Tsukiji Outer Market","category":"food","hours":1.5,"cost":20,"note":"Seafood stalls and snacks."},
-        {"name":"Ueno Park & Museums","category":"culture","hours":2.5,"cost":10,"note":"Museums and park space."}
+        {"name":"Senso-ji Temple (Asakusa)","category":"culture","hours":1.5,"cost":0,"lat":35.7148,"lon":139.7967,"note":"Historic temple and market street."},
+        {"name":"Meiji Shrine & Harajuku","category":"culture","hours":2,"cost":0,"lat":35.6764,"lon":139.6993,"note":"Shrine plus trendy neighborhood."},
+        {"name":"Shibuya Crossing & Center Gai","category":"landmark","hours":1.5,"cost":0,"lat":35.6595,"lon":139.7005,"note":"Iconic intersection and shopping."},
+        {"name":"Tokyo Skytree","category":"landmark","hours":2,"cost":20,"lat":35.7101,"lon":139.8107,"note":"Observation decks."},
+        {"name":"Tsukiji Outer Market","category":"food","hours":1.5,"cost":20,"lat":35.6655,"lon":139.7707,"note":"Seafood stalls and snacks."},
+        {"name":"Ueno Park & Museums","category":"culture","hours":2.5,"cost":10,"lat":35.7156,"lon":139.7745,"note":"Museums and park space."}
     ],
     "Mumbai": [
-        {"name":"Gateway of India","category":"landmark","hours":1,"cost":0,"note":"Historic waterfront monument."},
-        {"name":"Elephanta Caves (ferry)","category":"culture","hours":4,"cost":10,"note":"Day trip by ferry."},
-        {"name":"Marine Drive & Chowpatty","category":"relax","hours":1.5,"cost":0,"note":"Sunset strolls."},
-        {"name":"Chhatrapati Shivaji Maharaj Vastu Sangrahalaya","category":"culture","hours":2,"cost":5,"note":"Museum with diverse collection."},
-        {"name":"Colaba Causeway (markets)","category":"shopping","hours":2,"cost":15,"note":"Street shopping & cafes."},
-        {"name":"Sanjay Gandhi National Park","category":"nature","hours":4,"cost":8,"note":"Nature and small hikes."}
+        {"name":"Gateway of India","category":"landmark","hours":1,"cost":0,"lat":18.922,"lon":72.8347,"note":"Historic waterfront monument."},
+        {"name":"Elephanta Caves (ferry)","category":"culture","hours":4,"cost":10,"lat":18.9633,"lon":72.9315,"note":"Day trip by ferry."},
+        {"name":"Marine Drive & Chowpatty","category":"relax","hours":1.5,"cost":0,"lat":18.9432,"lon":72.823,"note":"Sunset strolls."},
+        {"name":"Chhatrapati Shivaji Maharaj Vastu Sangrahalaya","category":"culture","hours":2,"cost":5,"lat":18.9269,"lon":72.8326,"note":"Museum with diverse collection."},
+        {"name":"Colaba Causeway (markets)","category":"shopping","hours":2,"cost":15,"lat":18.915,"lon":72.8258,"note":"Street shopping & cafes."},
+        {"name":"Sanjay Gandhi National Park","category":"nature","hours":4,"cost":8,"lat":19.2147,"lon":72.9106,"note":"Nature and small hikes."}
     ]
 }
 
+# -------------------------
+# 2) Spatial index (grid over projected km coordinates)
+# -------------------------
+KM_PER_DEG_LAT = 110.574
+CITY_SPEED_KMH = 20  # rough door-to-door pace for travel-time estimates
+
+class CityIndex:
+    """
+    Per-city POI index built once: lat/lon projected to local km (equirectangular,
+    fine at city scale) and bucketed into square grid cells, so nearest-neighbour
+    queries only look at cells around the point; plus, per category, POI ids sorted
+    by cost so a budget cap is one bisect. POIs are referred to by their position
+    in ATTRACTIONS[city].
+    """
+    def __init__(self, pois, cell_km=1.0):
+        self.pois = pois
+        self.cell_km = cell_km
+        located = [p for p in pois if "lat" in p and "lon" in p]
+        lat0 = sum(p["lat"] for p in located) / len(located) if located else 0.0
+        self.kx = KM_PER_DEG_LAT * math.cos(math.radians(lat0))
+        self.xy = [(p.get("lon", 0.0) * self.kx, p.get("lat", 0.0) * KM_PER_DEG_LAT) for p in pois]
+        self.cells = {}
+        for i, (x, y) in enumerate(self.xy):
+            self.cells.setdefault((int(x // cell_km), int(y // cell_km)), []).append(i)
+        xs = [c[0] for c in self.cells] or [0]
+        ys = [c[1] for c in self.cells] or [0]
+        self.max_ring = max(max(xs) - min(xs), max(ys) - min(ys)) + 1  # rings past this are empty
+        by_cat = {}
+        for i, p in enumerate(pois):
+            by_cat.setdefault(p["category"], []).append(i)
+        self.by_cat = {}
+        for cat, ids in by_cat.items():
+            ids.sort(key=lambda i: pois[i]["cost"])
+            self.by_cat[cat] = (ids, [pois[i]["cost"] for i in ids])
+
+    def candidates(self, categories=None, max_cost=None):
+        """Candidates view for POIs in `categories` (all if empty) costing <= max_cost."""
+        cats = [c for c in dict.fromkeys(categories or self.by_cat) if c in self.by_cat]  # repeats would count twice
+        parts = []
+        for c in cats:
+            ids, costs = self.by_cat[c]
+            end = len(ids) if max_cost is None else bisect.bisect_right(costs, max_cost)
+            if end:
+                parts.append((ids, end))
+        return Candidates(self, set(cats), max_cost, parts)
+
+    def dist(self, i, j):
+        (x1, y1), (x2, y2) = self.xy[i], self.xy[j]
+        return math.hypot(x1 - x2, y1 - y2)
+
+    def nearest(self, i, k, allowed):
+        """Up to k ids from `allowed` (a set, i excluded) closest to POI i, nearest first."""
+        x, y = self.xy[i]
+        cx, cy = int(x // self.cell_km), int(y // self.cell_km)
+        found = []
+        remaining = len(allowed) - (i in allowed)
+        seen = 0
+        r = 0
+        # grow square rings of cells; stop once the k-th best is closer than the ring edge
+        while seen < remaining and r <= self.max_ring:
+            ring = [(cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1)
+                    if max(abs(dx), abs(dy)) == r]
+            for cell in ring:
+                for j in self.cells.get(cell, ()):
+                    if j != i and j in allowed:
+                        found.append((self.dist(i, j), j))
+                        seen += 1
+            if len(found) >= k:
+                found.sort()
+                found = found[:k]
+                if found[-1][0] <= r * self.cell_km:
+                    break
+            r += 1
+        found.sort()
+        return [j for _, j in found[:k]]
+
+class Candidates:
+    """
+    The POIs matching a query, as (cost-sorted id list, cut-off) prefixes of the index:
+    nothing is copied. Membership is a category/cost check and sampling picks a random
+    position across the prefixes; ids passed to `discard` are skipped afterwards.
+    """
+    def __init__(self, index, categories, max_cost, parts):
+        self.index = index
+        self.categories = categories
+        self.max_cost = max_cost
+        self.parts = parts
+        self.offsets = []
+        total = 0
+        for _, end in parts:
+            self.offsets.append(total)
+            total += end
+        self.total = total
+        self.used = set()
+
+    def __len__(self):
+        return self.total - len(self.used)
+
+    def __contains__(self, i):
+        p = self.index.pois[i]
+        return (i not in self.used and p["category"] in self.categories
+                and (self.max_cost is None or p["cost"] <= self.max_cost))
+
+    def discard(self, i):
+        if i in self:
+            self.used.add(i)
+
+    def difference_update(self, ids):
+        for i in ids:
+            self.discard(i)
+
+    def __iter__(self):
+        for ids, end in self.parts:
+            for k in range(end):
+                if ids[k] not in self.used:
+                    yield ids[k]
+
+    def sample(self, rng=random):
+        """A random unused candidate, or None when all are used."""
+        if len(self) <= 0:
+            return None
+        for _ in range(32):
+            pos = rng.randrange(self.total)
+            part = bisect.bisect_right(self.offsets, pos) - 1
+            i = self.parts[part][0][pos - self.offsets[part]]
+            if i not in self.used:
+                return i
+        return next(iter(self), None)  # mostly used up: take any that is left
+
+_CITY_INDEX = {}
+
+def city_index(city):
+    idx = _CITY_INDEX.get(city)
+    if idx is None or idx.pois is not ATTRACTIONS.get(city) or len(idx.pois) != len(idx.xy):
+        idx = _CITY_INDEX[city] = CityIndex(ATTRACTIONS.get(city, []))
+    return idx
+
+def route_length(index, order):
+    return sum(index.dist(a, b) for a, b in zip(order, order[1:]))
+
+def order_stops(index, ids):
+    """Short open path through ids: nearest-neighbour from the first stop, then 2-opt."""
+    if len(ids) < 3:
+        return list(ids)
+    route = [ids[0]]
+    left = set(ids[1:])
+    while left:
+        nxt = min(left, key=lambda j: index.dist(route[-1], j))
+        route.append(nxt)
+        left.remove(nxt)
+    d = index.dist
+    n = len(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                # reverse route[i..j]; only the edges entering/leaving the segment change
+                before = (d(route[i - 1], route[i]) if i else 0) + (d(route[j], route[j + 1]) if j < n - 1 else 0)
+                after = (d(route[i - 1], route[j]) if i else 0) + (d(route[i], route[j + 1]) if j < n - 1 else 0)
+                if after < before - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route
+
+def plan_days(index, candidates, days, per_day):
+    """
+    Split candidates into day clusters: each day starts from a randomly sampled unused
+    candidate and takes its nearest unused neighbours, then is route-ordered.
+    """
+    if per_day < 1:
+        return [[] for _ in range(days)]  # nothing asked for, nothing scheduled (as before)
+    plans = []
+    for _ in range(days):
+        seed = candidates.sample()
+        if seed is None:
+            plans.append([])
+            continue
+        candidates.discard(seed)
+        group = [seed] + index.nearest(seed, per_day - 1, candidates) if per_day > 1 else [seed]
+        candidates.difference_update(group)
+        plans.append(order_stops(index, group))
+    return plans
+
 # -------------------------
 # Helpers: itinerary generation & HTML
 # -------------------------
+# budget_level -> max cost per attraction (None = no cap)
+BUDGET_CAPS = {"low": 15, "medium": 30, "high": None}
+
+def matching_candidates(city, interests, budget_level):
+    # allow category match (interest like 'culture','food','nature','shopping','landmark','relax')
+    index = city_index(city)
+    found = index.candidates(interests, BUDGET_CAPS.get(budget_level))
+    if not len(found):
+        found = index.candidates()  # fallback to everything
+    return found
+
 def find_matching_attractions(city, interests, budget_level):
     pool = ATTRACTIONS.get(city, [])
-    if not interests:
-        filtered = pool[:]
-    else:
-        # allow category match (interest like 'culture','food','nature','shopping','landmark','relax')
-        filtered = [p for p in pool if p["category"] in interests]
-    # budget_level: 'low','medium','high' — filter by cost heuristics
-    if budget_level == "low":
-        filtered = [p for p in filtered if p["cost"] <= 15]
-    elif budget_level == "medium":
-        filtered = [p for p in filtered if p["cost"] <= 30]
-    # else high: keep all
-    if not filtered:
-        filtered = pool[:]  # fallback to everything
-    random.shuffle(filtered)
-    return filtered
+    ids = list(matching_candidates(city, interests, budget_level))
+    random.shuffle(ids)
+    return [pool[i] for i in ids]
 
 def generate_itinerary(city, start_date, days, interests, budget_level, activities_per_day=3):
-    pool = find_matching_attractions(city, interests, budget_level)
-    used = set()
+    pool = ATTRACTIONS.get(city, [])
+    index = city_index(city)
+    candidates = matching_candidates(city, interests, budget_level)
     itinerary = []
     # approximate day windows in hours to place activities
     day_windows = [("Morning",9,12), ("Afternoon",13,17), ("Evening",18,21)]
-    for d in range(days):
+    per_day = min(activities_per_day, len(day_windows))
+    for d, stops in enumerate(plan_days(index, candidates, days, per_day)):
         day_date = start_date + datetime.timedelta(days=d)
-        day_plan = {"date": day_date, "slots": []}
-        # pick up to activities_per_day activities spaced into windows
-        choices = [p for p in pool if p["name"] not in used]
-        idx = 0
-        for slot_name, start_h, end_h in day_windows:
-            if len(day_plan["slots"]) >= activities_per_day:
-                break
-            if idx >= len(choices):
-                break
-            # select an attraction that fits a single slot (duration <= slot hours + small buffer)
-            candidate = choices[idx]
-            idx += 1
-            used.add(candidate["name"])
+        km = route_length(index, stops)
+        day_plan = {"date": day_date, "slots": [], "km": round(km, 1),
+                    "travel_min": round(km / CITY_SPEED_KMH * 60)}
+        for (slot_name, start_h, end_h), i in zip(day_windows, stops):
+            candidate = pool[i]
             est_start = start_h
             est_end = min(end_h, start_h + max(1, int(candidate["hours"])))
             slot = {
@@ -98,7 +275,9 @@ def generate_itinerary(city, start_date, days, interests, budget_level, activiti
                 "category": candidate["category"],
                 "hours": candidate["hours"],
                 "cost": candidate["cost"],
-                "note": candidate.get("note","")
+                "note": candidate.get("note",""),
+                "lat": candidate.get("lat"),
+                "lon": candidate.get("lon"),
             }
             day_plan["slots"].append(slot)
         itinerary.append(day_plan)
@@ -127,6 +306,8 @@ def itinerary_to_html(city, start_date, days, itinerary, interests, budget_level
                          f"<span style='color:#333'>{s['note']}</span> "
                          f"<a href='{link}' target='_blank'>[map]</a></li>").format(name=s["name"])
             html += "</ol>"
+            if len(day["slots"]) > 1 and "km" in day:
+                html += f"<p style='color:#555;margin:0;'>Route: ≈ {day['km']} km between stops (~{day['travel_min']} min)</p>"
         html += "</div>"
     # packing tips
     html += "<div style='padding:12px;border-radius:8px;background:#fff7e6;margin-top:8px;'>"
@@ -212,8 +393,62 @@ def run_cli():
     else:
         print("Done. You can open the HTML file to see formatted itinerary (or run the notebook UI).")
 
+# -------------------------
+# Benchmark (synthetic large city)
+# -------------------------
+def synthetic_city(n=10_000, center=(48.8566, 2.3522), radius_km=15, seed=3):
+    rng = random.Random(seed)
+    cats = ["culture","food","nature","shopping","landmark","relax"]
+    pois = []
+    for i in range(n):
+        r, a = radius_km * math.sqrt(rng.random()), rng.random() * 2 * math.pi
+        pois.append({"name": f"POI {i}", "category": rng.choice(cats), "hours": rng.choice([1, 1.5, 2, 3]),
+                     "cost": rng.choice([0, 5, 10, 15, 20, 30, 45]), "note": "",
+                     "lat": center[0] + r * math.sin(a) / KM_PER_DEG_LAT,
+                     "lon": center[1] + r * math.cos(a) / (KM_PER_DEG_LAT * math.cos(math.radians(center[0])))})
+    return pois
+
+def benchmark_planner(n=10_000, days=14, per_day=3, runs=50, interests=("culture", "food")):
+    """Index build time and mean 14-day plan time on a synthetic n-POI city, with km vs unordered picks."""
+    city = f"Synthetic {n}"
+    ATTRACTIONS[city] = synthetic_city(n)
+    try:
+        t = time.perf_counter()
+        index = city_index(city)
+        build_ms = (time.perf_counter() - t) * 1000
+        start = datetime.date.today()
+        t = time.perf_counter()
+        for _ in range(runs):
+            it = generate_itinerary(city, start, days, list(interests), "medium", per_day)
+        plan_ms = (time.perf_counter() - t) / runs * 1000
+        planned_km = sum(day["km"] for day in it)
+        # baseline: the same number of stops per day taken in shuffled order
+        ids = list(matching_candidates(city, list(interests), "medium"))
+        random.shuffle(ids)
+        naive_km = sum(route_length(index, ids[d * per_day:(d + 1) * per_day]) for d in range(days))
+    finally:
+        del ATTRACTIONS[city]
+        _CITY_INDEX.pop(city, None)
+    return {"pois": n, "days": days, "index_build_ms": round(build_ms, 1), "plan_ms": round(plan_ms, 2),
+            "route_km": round(planned_km, 1), "shuffled_km": round(naive_km, 1)}
+
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(prog="travel-planner")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("bench-plan", help="plan time on a synthetic large city")
+    p.add_argument("--pois", type=int, default=10_000)
+    p.add_argument("--days", type=int, default=14)
+    args = parser.parse_args(argv)
+    if args.command == "bench-plan":
+        print(json.dumps(benchmark_planner(args.pois, args.days), indent=2))
+
+CLI_COMMANDS = ("bench-plan",)
+
 # Run appropriate interface
-if HAS_WIDGETS:
-    run_with_widgets()
-else:
-    run_cli()
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        run_command_line(sys.argv[1:])
+    elif HAS_WIDGETS:
+        run_with_widgets()
+    else:
+        run_cli()
@@ -1,6 +1,7 @@
 # ---------------- Customer Service Chatbot (single Jupyter cell) ----------------
-import re, math, os, datetime, json, random
-from collections import Counter, defaultdict
+import re, math, os, sys, time, datetime, json, random, argparse, itertools, asyncio, http, threading, sqlite3, csv, zlib, hashlib
+from collections import Counter, defaultdict, deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from IPython.display import display, HTML, clear_output
 
 # try ipywidgets for UI; fallback to CLI if not available
@@ -10,6 +11,13 @@ try:
 except Exception:
     HAS_WIDGETS = False
 
+# numpy/scipy make batch FAQ scoring a single sparse product; optional
+try:
+    import numpy as np
+    from scipy import sparse
+except Exception:
+    np = sparse = None
+
 # ----------------------
 # 1) Small FAQ knowledge base
 # ----------------------
@@ -33,8 +41,11 @@ FAQ = [
 # Build a question corpus for retrieval
 FAQ_QUESTIONS = [f["q"] for f in FAQ]
 
+# Optional external FAQ file (JSON list of {"q","a"} or CSV with q,a columns); replaces the list above
+FAQ_PATH = os.environ.get("CS_FAQ_PATH")
+
 # ----------------------
-# 2) Small utilities: preprocess, vectorize, similarity
+# 2) Small utilities: preprocess, tokenize, TF-IDF index
 # ----------------------
 def preprocess(text):
     text = text.lower()
@@ -45,117 +56,742 @@ def preprocess(text):
 def tokenize(text):
     return text.split()
 
-def term_freq_vector(tokens, vocab):
-    vec = [0]*len(vocab)
-    counts = Counter(tokens)
-    for i, w in enumerate(vocab):
-        vec[i] = counts.get(w, 0)
-    return vec
+def question_terms(question):
+    return Counter(tokenize(preprocess(question)))
 
-def dot(u, v): 
-    return sum(ux*vx for ux,vx in zip(u,v))
+class FAQIndex:
+    """Inverted TF-IDF index over FAQ questions.
 
-def norm(u): 
-    return math.sqrt(dot(u,u))
+    Built once; a query only walks the postings of its own tokens, so the cost
+    per message depends on how common those tokens are, not on the FAQ size.
+    """
+    def __init__(self, questions, counts=None):
+        if counts is None:
+            counts = [question_terms(q) for q in questions]
+        self.size = len(counts)
+        self.counts = counts
+        df = Counter()
+        for c in counts:
+            df.update(c.keys())
+        # smoothed idf (terms in every question keep a small positive weight)
+        self.idf = {t: math.log((1 + self.size) / (1 + d)) + 1.0 for t, d in df.items()}
+        self.unseen_idf = math.log(1 + self.size) + 1.0
+        postings = defaultdict(list)
+        self.norms = []
+        for i, c in enumerate(counts):
+            sq = 0.0
+            for t, tf in c.items():
+                w = tf * self.idf[t]
+                postings[t].append((i, w))
+                sq += w * w
+            self.norms.append(math.sqrt(sq))
+        self.postings = dict(postings)
+        self.term_ids = None
+        self._doc_matrix = None
 
-def cosine_sim(u, v):
-    nu, nv = norm(u), norm(v)
-    if nu==0 or nv==0: 
-        return 0.0
-    return dot(u,v)/(nu*nv)
-
-def best_faq_match(user_text, threshold=0.35):
-    # build vocabulary from FAQ questions + user tokens
-    pre_user = preprocess(user_text)
-    user_tokens = tokenize(pre_user)
-    all_tokens = set(user_tokens)
-    for q in FAQ_QUESTIONS:
-        all_tokens |= set(tokenize(preprocess(q)))
-    vocab = sorted(list(all_tokens))
-    # vectors
-    uvec = term_freq_vector(user_tokens, vocab)
-    best_score = 0.0
-    best_idx = -1
-    for i,q in enumerate(FAQ_QUESTIONS):
-        qtokens = tokenize(preprocess(q))
-        qvec = term_freq_vector(qtokens, vocab)
-        s = cosine_sim(uvec, qvec)
-        if s>best_score:
-            best_score = s; best_idx = i
-    if best_score >= threshold:
+    def query_weights(self, text):
+        counts = Counter(tokenize(preprocess(text)))
+        weights = {t: tf * self.idf.get(t, self.unseen_idf) for t, tf in counts.items()}
+        return weights, math.sqrt(sum(w * w for w in weights.values()))
+
+    def best_match(self, text):
+        """Return (index, cosine score) of the closest question, or (-1, 0.0)."""
+        weights, qnorm = self.query_weights(text)
+        if qnorm == 0:
+            return -1, 0.0
+        acc = {}
+        for t, w in weights.items():
+            for i, dw in self.postings.get(t, ()):
+                acc[i] = acc.get(i, 0.0) + w * dw
+        best_idx, best_score = -1, 0.0
+        for i, d in acc.items():
+            s = d / (qnorm * self.norms[i])
+            if s > best_score or (s == best_score and i < best_idx):
+                best_idx, best_score = i, s
+        return best_idx, best_score
+
+    def best_among(self, text, ids):
+        """best_match restricted to the questions in `ids` (exact re-scoring of ANN candidates)."""
+        weights, qnorm = self.query_weights(text)
+        best_idx, best_score = -1, 0.0
+        if qnorm == 0:
+            return best_idx, best_score
+        for i in sorted(ids):
+            c = self.counts[i]
+            d = sum(w * c[t] * self.idf[t] for t, w in weights.items() if t in c)
+            if d > 0:
+                s = d / (qnorm * self.norms[i])
+                if s > best_score:
+                    best_idx, best_score = i, s
+        return best_idx, best_score
+
+    def doc_matrix(self):
+        """Sparse terms x questions matrix of L2-normalised weights (built on first batch use)."""
+        if self._doc_matrix is None:
+            term_ids = {t: j for j, t in enumerate(self.postings)}
+            rows, cols, vals = [], [], []
+            for t, plist in self.postings.items():
+                for i, w in plist:
+                    rows.append(term_ids[t]); cols.append(i); vals.append(w / self.norms[i])
+            self._doc_matrix = sparse.csr_matrix((vals, (rows, cols)), shape=(len(term_ids), self.size))
+            self.term_ids = term_ids
+        return self._doc_matrix
+
+    def best_matches(self, texts):
+        """best_match for many texts; one sparse matrix product when SciPy is available."""
+        if sparse is None or self.size == 0 or not texts:
+            return [self.best_match(t) for t in texts]
+        docs = self.doc_matrix()
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            weights, qnorm = self.query_weights(text)
+            for t, w in weights.items():
+                j = self.term_ids.get(t)
+                if j is not None:
+                    indices.append(j); data.append(w / qnorm)
+            indptr.append(len(indices))
+        queries = sparse.csr_matrix((data, indices, indptr), shape=(len(texts), docs.shape[0]))
+        scores = (queries @ docs).tocsr()
+        scores.sum_duplicates()  # sorted columns, so ties resolve to the lowest index like best_match
+        best = np.asarray(scores.argmax(axis=1)).ravel()
+        top = scores.max(axis=1).toarray().ravel()
+        return [(int(i), float(v)) if v > 0 else (-1, 0.0) for i, v in zip(best, top)]
+
+class MinHashLSH:
+    """Approximate FAQ candidate search: MinHash over question tokens, bucketed by LSH bands.
+
+    Questions sharing at least one band with the query become candidates and are
+    re-scored exactly by the FAQIndex, so the approximation only costs recall.
+    More bands (or fewer rows per band) raise recall and the candidate count.
+    Needs numpy.
+    """
+    def __init__(self, index, bands=16, rows=4, seed=1, max_candidates=2000, chunk=20000):
+        self.index = index
+        self.bands, self.rows = bands, rows
+        self.max_candidates = max_candidates
+        k = bands * rows
+        rng = np.random.default_rng(seed)
+        # multiply-shift hashing: h(x) = ((a*x + b) mod 2^64) >> 32 with odd a
+        self.a = rng.integers(0, 2**63, size=k, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=k, dtype=np.uint64)
+        self.mix = rng.integers(0, 2**63, size=rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.vocab = {t: j for j, t in enumerate(index.idf)}
+        self.token_hashes = self._hash(list(self.vocab))
+        sig = np.full((index.size, k), np.iinfo(np.uint32).max, dtype=np.uint32)
+        for lo in range(0, index.size, chunk):
+            counts = index.counts[lo:lo + chunk]
+            lengths = np.array([len(c) for c in counts], dtype=np.int64)
+            keep = np.flatnonzero(lengths)
+            if keep.size == 0:
+                continue
+            flat = np.fromiter((self.vocab[t] for c in counts for t in c), dtype=np.int64, count=int(lengths.sum()))
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[keep]
+            sig[lo + keep] = np.minimum.reduceat(self.token_hashes[flat], starts, axis=0)
+        keys = self._band_keys(sig)
+        # per band: keys sorted once, so a lookup is two binary searches
+        self.order = np.argsort(keys, axis=0, kind="stable")
+        self.sorted_keys = np.take_along_axis(keys, self.order, axis=0)
+
+    def _hash(self, tokens):
+        base = np.array([zlib.crc32(t.encode("utf-8")) for t in tokens], dtype=np.uint64).reshape(-1, 1)
+        with np.errstate(over="ignore"):
+            return ((base * self.a + self.b) >> np.uint64(32)).astype(np.uint32)
+
+    def _band_keys(self, sig):
+        bands = sig.reshape(sig.shape[0], self.bands, self.rows).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            return (bands * self.mix).sum(axis=2, dtype=np.uint64)
+
+    def candidates(self, text):
+        tokens = set(tokenize(preprocess(text)))
+        if not tokens:
+            return []
+        known = [self.vocab[t] for t in tokens if t in self.vocab]
+        unknown = [t for t in tokens if t not in self.vocab]
+        rows = [self.token_hashes[known]] if known else []
+        if unknown:
+            rows.append(self._hash(unknown))
+        sig = np.concatenate(rows).min(axis=0, keepdims=True)
+        keys = self._band_keys(sig)[0]
+        found = []
+        for b in range(self.bands):
+            col = self.sorted_keys[:, b]
+            lo = np.searchsorted(col, keys[b], side="left")
+            hi = np.searchsorted(col, keys[b], side="right")
+            if hi > lo:
+                found.append(self.order[lo:min(hi, lo + self.max_candidates), b])
+        return np.unique(np.concatenate(found)).tolist() if found else []
+
+    def best_match(self, text):
+        return self.index.best_among(text, self.candidates(text))
+
+# ----------------------
+# 3) FAQ file loading, versioned index snapshots, hot reload
+# ----------------------
+def load_faq_file(path):
+    """Read FAQ entries from JSON (a list, or {"faq": [...]}) or CSV (q,a or question,answer columns)."""
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        entries = [{"q": r.get("q") or r.get("question", ""), "a": r.get("a") or r.get("answer", "")} for r in rows]
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get("faq", []) if isinstance(data, dict) else data
+    return [e for e in entries if e.get("q") and e.get("a")]
+
+# "exact" scores every question sharing a token with the query; "ann" re-scores MinHash/LSH candidates only
+FAQ_MATCH_MODE = os.environ.get("CS_FAQ_MODE", "exact")
+
+class FAQSnapshot:
+    """One immutable version of the FAQ and its index; readers keep whichever one they grabbed."""
+    def __init__(self, version, faq, index, terms):
+        self.version = version
+        self.faq = faq
+        self.index = index
+        self.terms = terms  # question -> term counts, reused by the next rebuild
+        self._ann = None
+        self._ann_lock = threading.Lock()
+
+    def ann(self):
+        """MinHashLSH over this snapshot, built on first use (None without numpy)."""
+        if self._ann is None and np is not None:
+            with self._ann_lock:
+                if self._ann is None:
+                    self._ann = MinHashLSH(self.index)
+        return self._ann
+
+    def best_match(self, text, mode=None):
+        ann = self.ann() if (mode or FAQ_MATCH_MODE) == "ann" else None
+        return (ann or self.index).best_match(text)
+
+def build_snapshot(entries, previous=None):
+    # only new or edited questions are re-tokenized; weights are recomputed because idf is global
+    old_terms = previous.terms if previous is not None else {}
+    terms = {}
+    for e in entries:
+        q = e["q"]
+        if q not in terms:
+            terms[q] = old_terms.get(q) or question_terms(q)
+    index = FAQIndex(None, counts=[terms[e["q"]] for e in entries])
+    version = previous.version + 1 if previous is not None else 1
+    snapshot = FAQSnapshot(version, tuple(entries), index, terms)
+    if FAQ_MATCH_MODE == "ann":
+        snapshot.ann()  # build the LSH tables here too, not on the first message
+    return snapshot
+
+class FAQKnowledgeBase:
+    """Holds the current FAQSnapshot and swaps in a rebuilt one when the source file changes.
+
+    Rebuilds happen on the polling thread (or whoever calls reload); publishing
+    is a single attribute assignment, so in-flight matches finish on the
+    snapshot they started with.
+    """
+    def __init__(self, path=None, entries=None, poll_interval=5.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.stamp = self._stat()
+        self.snapshot = build_snapshot(load_faq_file(path) if path else list(entries or FAQ))
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        if not self.path:
+            return None
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def current(self):
+        return self.snapshot
+
+    def reload(self, force=False):
+        """Rebuild and publish if the file changed; returns True when a new snapshot went live."""
+        if not self.path:
+            return False
+        with self._reload_lock:
+            stamp = self._stat()
+            if stamp == self.stamp and not force:
+                return False
+            try:
+                snapshot = build_snapshot(load_faq_file(self.path), self.snapshot)
+            finally:
+                self.stamp = stamp  # a broken file is not retried until it changes again
+            self.snapshot = snapshot
+            return True
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.reload():
+                    print(f"FAQ reloaded: version {self.snapshot.version}, {len(self.snapshot.faq)} entries", file=sys.stderr)
+            except (OSError, ValueError) as e:
+                # half-written or invalid file: keep serving the previous snapshot
+                print(f"FAQ reload skipped: {e}", file=sys.stderr)
+
+    def start_polling(self):
+        if self.path and self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="faq-reload", daemon=True)
+            self._thread.start()
+
+    def stop_polling(self):
+        self._stop.set()
+
+FAQ_KB = FAQKnowledgeBase(FAQ_PATH)
+
+def use_faq_file(path, poll_interval=5.0):
+    global FAQ_KB
+    FAQ_KB = FAQKnowledgeBase(path, poll_interval=poll_interval)
+    return FAQ_KB
+
+def best_faq_match(user_text, threshold=0.35, snapshot=None, mode=None):
+    """(index, score) of the best FAQ question, or (None, score) below threshold.
+
+    mode is "exact" or "ann" (default FAQ_MATCH_MODE); ann falls back to exact without numpy.
+    """
+    snapshot = snapshot or FAQ_KB.current()
+    best_idx, best_score = snapshot.best_match(user_text, mode)
+    if best_idx >= 0 and best_score >= threshold:
         return best_idx, best_score
     return None, best_score
 
 # ----------------------
-# 3) Intent heuristics & handlers
+# 4) Order status backend (local SQLite stand-in for the order system)
+# ----------------------
+ORDER_DB_PATH = os.environ.get("CS_ORDER_DB", "orders_demo.sqlite3")
+ORDER_COLUMNS = ("order_number", "status", "carrier", "eta_days", "placed_on", "delivered_on")
+_MISSING = object()
+
+class TTLCache:
+    """LRU cache whose entries also expire `ttl` seconds after being stored."""
+    def __init__(self, maxsize=4096, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        """Cached value (may be None) or _MISSING."""
+        with self.lock:
+            item = self.data.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self.data[key]
+                self.misses += 1
+                return _MISSING
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + self.ttl)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+class SQLiteOrderStore:
+    """Order lookups through one shared SQLite connection.
+
+    The lookup SQL is a constant string, so sqlite3's statement cache keeps it
+    prepared; the unique index on order_number makes each lookup a B-tree probe.
+    """
+    LOOKUP_SQL = f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders WHERE order_number = ?"
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self.lock = threading.Lock()
+        create_order_schema(self.conn)
+
+    def lookup(self, order_number):
+        with self.lock:
+            row = self.conn.execute(self.LOOKUP_SQL, (order_number,)).fetchone()
+        return dict(zip(ORDER_COLUMNS, row)) if row else None
+
+    def close(self):
+        self.conn.close()
+
+class CachedOrderLookup:
+    """Puts a TTL-bounded LRU cache (including 'not found' answers) in front of a store."""
+    def __init__(self, store, maxsize=4096, ttl=60.0):
+        self.store = store
+        self.cache = TTLCache(maxsize, ttl)
+
+    def lookup(self, order_number):
+        info = self.cache.get(order_number)
+        if info is _MISSING:
+            info = self.store.lookup(order_number)
+            self.cache.put(order_number, info)
+        return info
+
+def create_order_schema(conn, with_index=True):
+    conn.execute("""CREATE TABLE IF NOT EXISTS orders (
+        order_number TEXT NOT NULL, status TEXT NOT NULL, carrier TEXT,
+        eta_days INTEGER, placed_on TEXT, delivered_on TEXT)""")
+    if with_index:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_number ON orders(order_number)")
+    conn.commit()
+
+# Anything with a lookup(order_number) -> dict | None method can be plugged in with set_order_lookup.
+ORDER_LOOKUP = None
+_order_lookup_lock = threading.Lock()
+
+def set_order_lookup(lookup):
+    global ORDER_LOOKUP
+    ORDER_LOOKUP = lookup
+
+def get_order_lookup():
+    """The configured lookup; opens ORDER_DB_PATH on first use if that file exists."""
+    global ORDER_LOOKUP
+    if ORDER_LOOKUP is None and os.path.exists(ORDER_DB_PATH):
+        with _order_lookup_lock:
+            if ORDER_LOOKUP is None:
+                ORDER_LOOKUP = CachedOrderLookup(SQLiteOrderStore(ORDER_DB_PATH))
+    return ORDER_LOOKUP
+
+ORDER_STATUSES = [("Processing", 0.10), ("Shipped", 0.15), ("In transit", 0.30),
+                  ("Out for delivery", 0.05), ("Delivered", 0.35), ("Cancelled", 0.05)]
+
+def generate_orders(path, count=3_000_000, seed=7, batch=100_000):
+    """Write `count` synthetic orders (numbers 10000000, 10000001, ...) to a SQLite file."""
+    rng = random.Random(seed)
+    names, weights = zip(*ORDER_STATUSES)
+    carriers = ["UPS", "FedEx", "DHL", "USPS", "BlueDart"]
+    today = datetime.date.today()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    create_order_schema(conn, with_index=False)  # index is built once after the bulk load
+    start = time.perf_counter()
+    for lo in range(0, count, batch):
+        rows = []
+        for i in range(lo, min(lo + batch, count)):
+            status = rng.choices(names, weights)[0]
+            placed = today - datetime.timedelta(days=rng.randint(0, 90))
+            delivered = placed + datetime.timedelta(days=rng.randint(2, 9)) if status == "Delivered" else None
+            rows.append((str(10_000_000 + i), status, rng.choice(carriers), rng.randint(1, 7),
+                         placed.isoformat(), delivered.isoformat() if delivered else None))
+        conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    create_order_schema(conn)
+    conn.close()
+    return {"orders": count, "seconds": round(time.perf_counter() - start, 2)}
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100.0 * len(sorted_values)))]
+
+def benchmark_orders(path, queries=100_000, distinct=5_000, seed=11):
+    """Lookup latency (microseconds) straight from SQLite and through the cache."""
+    store = SQLiteOrderStore(path)
+    total = store.conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    rng = random.Random(seed)
+    hot = [str(10_000_000 + rng.randrange(total)) for _ in range(distinct)]
+    keys = [rng.choice(hot) for _ in range(queries)]
+    report = {"orders": total, "queries": queries}
+    for name, lookup in (("storage", store), ("cached", CachedOrderLookup(store, maxsize=2 * distinct, ttl=300))):
+        lat = []
+        for k in keys:
+            t = time.perf_counter()
+            lookup.lookup(k)
+            lat.append((time.perf_counter() - t) * 1e6)
+        lat.sort()
+        report[name] = {"p50_us": round(percentile(lat, 50), 2), "p99_us": round(percentile(lat, 99), 2),
+                        "mean_us": round(sum(lat) / len(lat), 2)}
+    store.close()
+    return report
+
+# ----------------------
+# 5) Pipeline instrumentation (opt-in)
+# ----------------------
+class PipelineMetrics:
+    """Per-stage timings, branch taken and FAQ score for every handled message.
+
+    The last `window` samples per stage back rolling p50/p95/p99 figures, which
+    can be exported as JSON or Prometheus text. While METRICS is None the
+    message path pays a single global lookup.
+    """
+    QUANTILES = (50, 95, 99)
+
+    def __init__(self, window=10000, events=1000):
+        self.lock = threading.Lock()
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.sums = Counter()
+        self.counts = Counter()
+        self.branches = Counter()
+        self.faq_scores = deque(maxlen=window)
+        self.events = deque(maxlen=events)  # most recent per-message records
+
+    def record(self, timings, branch, faq_score):
+        with self.lock:
+            for stage, dt in timings.items():
+                self.samples[stage].append(dt)
+                self.sums[stage] += dt
+                self.counts[stage] += 1
+            self.branches[branch] += 1
+            if faq_score is not None:
+                self.faq_scores.append(faq_score)
+            self.events.append({"ts": time.time(), "branch": branch, "faq_score": faq_score,
+                                "ms": {k: round(v * 1e3, 4) for k, v in timings.items()}})
+
+    def record_stage(self, stage, dt):
+        with self.lock:
+            self.samples[stage].append(dt)
+            self.sums[stage] += dt
+            self.counts[stage] += 1
+
+    def summary(self):
+        with self.lock:
+            samples = {k: sorted(v) for k, v in self.samples.items()}
+            scores = sorted(self.faq_scores)
+            stages = {k: {"count": self.counts[k], "sum_s": self.sums[k],
+                          **{f"p{q}_ms": percentile(v, q) * 1e3 for q in self.QUANTILES}}
+                      for k, v in samples.items()}
+            return {"stages": stages, "branches": dict(self.branches),
+                    "faq_score": {f"p{q}": percentile(scores, q) for q in self.QUANTILES},
+                    "recent": list(self.events)[-20:]}
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self):
+        summary = self.summary()
+        lines = ["# HELP cs_stage_seconds Latency of each message pipeline stage (rolling window).",
+                 "# TYPE cs_stage_seconds summary"]
+        for stage, st in sorted(summary["stages"].items()):
+            for q in self.QUANTILES:
+                lines.append(f'cs_stage_seconds{{stage="{stage}",quantile="{q / 100}"}} {st[f"p{q}_ms"] / 1e3:.9f}')
+            lines.append(f'cs_stage_seconds_sum{{stage="{stage}"}} {st["sum_s"]:.9f}')
+            lines.append(f'cs_stage_seconds_count{{stage="{stage}"}} {st["count"]}')
+        lines += ["# HELP cs_branch_total Messages answered by each intent branch.", "# TYPE cs_branch_total counter"]
+        lines += [f'cs_branch_total{{branch="{b}"}} {n}' for b, n in sorted(summary["branches"].items())]
+        lines += ["# HELP cs_faq_score FAQ cosine score of fallback messages (rolling window).", "# TYPE cs_faq_score summary"]
+        lines += [f'cs_faq_score{{quantile="{q / 100}"}} {summary["faq_score"][f"p{q}"]:.6f}' for q in self.QUANTILES]
+        return "\n".join(lines) + "\n"
+
+METRICS = PipelineMetrics() if os.environ.get("CS_METRICS") else None
+
+def enable_metrics(window=10000):
+    global METRICS
+    METRICS = PipelineMetrics(window)
+    return METRICS
+
+def disable_metrics():
+    global METRICS
+    METRICS = None
+
+# ----------------------
+# 6) Intent heuristics & handlers
 # ----------------------
 ORDER_PAT = re.compile(r"(?:order|#order|order#|ord)\s*[:#]?\s*(\d{5,12})|#(\d{5,12})|(\d{6,12})")
 EMAIL_PAT = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
 PHONE_PAT = re.compile(r"\b\d{6,15}\b")
+FAQ_THRESHOLD = 0.35
 
-def handle_user_message(msg, history):
-    text = preprocess(msg)
-    # greetings
-    if re.search(r"\b(hi|hello|hey|good morning|good afternoon|good evening)\b", text):
-        return random.choice([
-            "Hello! 👋 How can I help you today?",
-            "Hi there! How may I assist you with your order or account?"
-        ])
-    # thanks/bye
-    if re.search(r"\b(thank|thanks|thx|bye|goodbye|see ya)\b", text):
-        return random.choice(["You're welcome! If you need anything else, I'm here.", "Happy to help — have a great day!"])
-    # order tracking
-    if re.search(r"\b(track|tracking|where.*order|status.*order)\b", text) or "track my order" in text:
-        m = ORDER_PAT.search(msg)
-        if m:
-            order_num = next(g for g in m.groups() if g)
-            return f"I found order **#{order_num}**. Current status: *In transit*. Estimated delivery: 2 business days. Would you like the tracking link?"
-        else:
-            return "Could you please provide your order number (e.g., `#12345678`)? I can check the shipping status for you."
-    # refund/return
-    if re.search(r"\b(return|refund|exchange|replace)\b", text):
-        m = ORDER_PAT.search(msg)
-        if m:
-            order_num = next(g for g in m.groups() if g)
-            return (f"Thanks — for order **#{order_num}**, you can start a return from Orders → Return. "
-                    "Return window is 30 days. Would you like me to open a return request for you?")
-        else:
-            return ("You can return items within 30 days in most cases. Please share your order number if you'd like me to start a return.")
-    # account/password
-    if re.search(r"\b(password|forgot|reset|login|sign in|account)\b", text):
-        if "forgot" in text or "reset" in text:
-            return "To reset your password, use 'Forgot password' on the login page — we'll email a reset link. Did you want me to resend a link?"
-        return "For account help, could you tell me if you're unable to login or want to change account details?"
-    # pricing/plans
-    if re.search(r"\b(price|cost|plan|subscription|pricing)\b", text):
-        return ("Our plans: Basic (free) — limited features; Pro — $9.99/mo; Business — $29.99/mo with priority support. "
-                "Would you like a comparison table?")
-    # troubleshooting / technical
-    if re.search(r"\b(crash|error|not working|bug|issue|slow|lag)\b", text):
-        # ask for app/platform and error text
-        if "app" in text or "mobile" in text or "desktop" in text:
-            return ("Try restarting the app, clearing cache, and ensuring the app is updated. "
-                    "If you see an error code, please share it (e.g., `Error 500`). Would you like steps tailored to Android or iOS?")
-        return ("Sorry you're seeing issues. Can you describe what you tried and any error messages you see?")
-    # invoice/billing
-    if re.search(r"\b(invoice|receipt|bill|billing)\b", text):
-        return "Invoices are available in your account under Orders → Invoice. I can email it to you if you provide the order number or your registered email."
-    # contact human
-    if re.search(r"\b(agent|human|representative|support)\b", text):
-        return "I can connect you to a support agent — please provide a short summary and your order number (if relevant)."
-
-    # fallback: try FAQ match
-    idx, score = best_faq_match(msg, threshold=0.35)
+def order_number(msg):
+    m = ORDER_PAT.search(msg)
+    return next(g for g in m.groups() if g) if m else None
+
+def reply_greeting(msg, text):
+    return random.choice([
+        "Hello! 👋 How can I help you today?",
+        "Hi there! How may I assist you with your order or account?"
+    ])
+
+def reply_thanks(msg, text):
+    return random.choice(["You're welcome! If you need anything else, I'm here.", "Happy to help — have a great day!"])
+
+def lookup_order(order_num):
+    """Order record, None if unknown, or _MISSING when no order backend is configured."""
+    lookup = get_order_lookup()
+    return _MISSING if lookup is None else lookup.lookup(order_num)
+
+def reply_tracking(msg, text):
+    order_num = order_number(msg)
+    if not order_num:
+        return "Could you please provide your order number (e.g., `#12345678`)? I can check the shipping status for you."
+    info = lookup_order(order_num)
+    if info is _MISSING:
+        return f"I found order **#{order_num}**. Current status: *In transit*. Estimated delivery: 2 business days. Would you like the tracking link?"
+    if info is None:
+        return f"I couldn't find order **#{order_num}**. Could you double-check the number from your confirmation email?"
+    if info["status"] == "Delivered":
+        return f"Order **#{order_num}** was delivered on {info['delivered_on']} via {info['carrier']}. Is anything wrong with the delivery?"
+    if info["status"] == "Cancelled":
+        return f"Order **#{order_num}** was cancelled, so it won't ship. Would you like help placing it again?"
+    return (f"I found order **#{order_num}**. Current status: *{info['status']}* with {info['carrier']}. "
+            f"Estimated delivery: {info['eta_days']} business day{'' if info['eta_days'] == 1 else 's'}. Would you like the tracking link?")
+
+def reply_refund(msg, text):
+    order_num = order_number(msg)
+    if not order_num:
+        return ("You can return items within 30 days in most cases. Please share your order number if you'd like me to start a return.")
+    info = lookup_order(order_num)
+    if info is None:
+        return f"I couldn't find order **#{order_num}**. Could you double-check the number so I can start the return?"
+    if info is not _MISSING and info["status"] == "Cancelled":
+        return f"Order **#{order_num}** was cancelled, so any payment is refunded automatically to the original method."
+    if info is not _MISSING and info["status"] == "Processing":
+        return f"Order **#{order_num}** hasn't shipped yet, so I can cancel it for a full refund instead. Shall I?"
+    if info is not _MISSING and info["status"] != "Delivered":
+        return (f"Order **#{order_num}** is currently *{info['status']}*. Once it arrives you have 30 days to return it, "
+                "or you can refuse the delivery for an automatic refund.")
+    if info is not _MISSING and info["delivered_on"]:
+        days = (datetime.date.today() - datetime.date.fromisoformat(info["delivered_on"])).days
+        if days > 30:
+            return (f"Order **#{order_num}** was delivered {days} days ago, outside the 30-day return window. "
+                    "I can connect you to an agent if the item is faulty.")
+    return (f"Thanks — for order **#{order_num}**, you can start a return from Orders → Return. "
+            "Return window is 30 days. Would you like me to open a return request for you?")
+
+def reply_account(msg, text):
+    if "forgot" in text or "reset" in text:
+        return "To reset your password, use 'Forgot password' on the login page — we'll email a reset link. Did you want me to resend a link?"
+    return "For account help, could you tell me if you're unable to login or want to change account details?"
+
+def reply_pricing(msg, text):
+    return ("Our plans: Basic (free) — limited features; Pro — $9.99/mo; Business — $29.99/mo with priority support. "
+            "Would you like a comparison table?")
+
+def reply_troubleshooting(msg, text):
+    # ask for app/platform and error text
+    if "app" in text or "mobile" in text or "desktop" in text:
+        return ("Try restarting the app, clearing cache, and ensuring the app is updated. "
+                "If you see an error code, please share it (e.g., `Error 500`). Would you like steps tailored to Android or iOS?")
+    return ("Sorry you're seeing issues. Can you describe what you tried and any error messages you see?")
+
+def reply_billing(msg, text):
+    return "Invoices are available in your account under Orders → Invoice. I can email it to you if you provide the order number or your registered email."
+
+def reply_agent(msg, text):
+    return "I can connect you to a support agent — please provide a short summary and your order number (if relevant)."
+
+# Intent table in priority order: (name, whole-word keywords/phrases, extra regex or None, handler).
+# Keywords cover almost everything; the regex column is only for patterns that are not plain words.
+INTENTS = [
+    ("greeting", ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"], None, reply_greeting),
+    ("thanks", ["thank", "thanks", "thx", "bye", "goodbye", "see ya"], None, reply_thanks),
+    ("tracking", ["track", "tracking"], r"\b(?:where.*order|status.*order)\b|track my order", reply_tracking),
+    ("refund", ["return", "refund", "exchange", "replace"], None, reply_refund),
+    ("account", ["password", "forgot", "reset", "login", "sign in", "account"], None, reply_account),
+    ("pricing", ["price", "cost", "plan", "subscription", "pricing"], None, reply_pricing),
+    ("troubleshooting", ["crash", "error", "not working", "bug", "issue", "slow", "lag"], None, reply_troubleshooting),
+    ("billing", ["invoice", "receipt", "bill", "billing"], None, reply_billing),
+    ("agent", ["agent", "human", "representative", "support"], None, reply_agent),
+]
+
+WORD_PAT = re.compile(r"[a-z0-9]+")
+
+class IntentRouter:
+    """Intent table compiled once into a keyword table plus one named-group regex.
+
+    Keywords are looked up per token, so adding intents does not add passes over
+    the text; regex-only patterns share a single lookahead alternation.
+    """
+    def __init__(self, table):
+        self.names = [row[0] for row in table]
+        self.priority = {name: i for i, name in enumerate(self.names)}
+        self.handlers = {name: handler for name, _, _, handler in table}
+        self.phrases = defaultdict(list)  # first word -> [(remaining words, intent)]
+        patterns = []
+        for name, keywords, pattern, _ in table:
+            for kw in keywords:
+                words = kw.split()
+                self.phrases[words[0]].append((tuple(words[1:]), name))
+            if pattern:
+                patterns.append(f"(?P<{name}>{pattern})")
+        # a lookahead tries every start position, so an early low-priority match cannot hide a later one
+        self.pattern = re.compile("(?=" + "|".join(patterns) + ")") if patterns else None
+        self.pattern_rank = min((self.priority[n] for n, _, p, _ in table if p), default=len(table))
+
+    def _keyword_hits(self, text):
+        toks = list(WORD_PAT.finditer(text))
+        for k, m in enumerate(toks):
+            for rest, name in self.phrases.get(m.group(), ()):
+                end = k + len(rest)
+                if end < len(toks) and all(
+                        toks[k + j].group() == w and text[toks[k + j - 1].end():toks[k + j].start()] == " "
+                        for j, w in enumerate(rest, 1)):
+                    yield name
+
+    def match(self, text):
+        """All intents that fire for preprocessed text, highest priority first."""
+        found = set(self._keyword_hits(text))
+        if self.pattern is not None:
+            found.update(m.lastgroup for m in self.pattern.finditer(text))
+        return sorted(found, key=self.priority.get)
+
+    def first(self, text):
+        """Highest-priority intent for preprocessed text, or None."""
+        best = min(map(self.priority.get, self._keyword_hits(text)), default=len(self.names))
+        if self.pattern is not None and self.pattern_rank < best:
+            for m in self.pattern.finditer(text):
+                best = min(best, self.priority[m.lastgroup])
+        return self.names[best] if best < len(self.names) else None
+
+INTENT_ROUTER = IntentRouter(INTENTS)
+
+def intent_reply(msg, text):
+    """Highest-priority rule intent and its reply; (None, None) falls through to the FAQ."""
+    name = INTENT_ROUTER.first(text)
+    if name is None:
+        return None, None
+    return name, INTENT_ROUTER.handlers[name](msg, text)
+
+def faq_reply(idx, score, snapshot):
     if idx is not None:
-        fa = FAQ[idx]["a"]
-        return f"{fa} (confidence {score:.2f})"
+        fa = snapshot.faq[idx]["a"]
+        return "faq", f"{fa} (confidence {score:.2f})"
     # low-confidence fallback
     # ask clarifying question or offer human agent
-    return ("I didn't fully understand — do you mean one of the following?\n"
+    return "fallback", ("I didn't fully understand — do you mean one of the following?\n"
             "- Track an order\n- Start a return\n- Reset account password\nOr reply 'escalate' to contact a human agent.")
 
+def route_message(msg):
+    """Return (intent, reply, faq_score); faq_score is None when a rule intent answered."""
+    if METRICS is not None:
+        return route_message_timed(msg, METRICS)
+    intent, reply = intent_reply(msg, preprocess(msg))
+    if intent is not None:
+        return intent, reply, None
+    # fallback: try FAQ match (answer comes from the same snapshot that was scored)
+    snapshot = FAQ_KB.current()
+    idx, score = best_faq_match(msg, threshold=FAQ_THRESHOLD, snapshot=snapshot)
+    intent, reply = faq_reply(idx, score, snapshot)
+    return intent, reply, score
+
+def route_message_timed(msg, metrics):
+    # same steps as route_message, with a clock read between stages
+    clock = time.perf_counter
+    t0 = clock()
+    text = preprocess(msg)
+    t1 = clock()
+    intent = INTENT_ROUTER.first(text)
+    t2 = clock()
+    timings = {"preprocess": t1 - t0, "intent": t2 - t1}
+    score = None
+    if intent is not None:
+        reply = INTENT_ROUTER.handlers[intent](msg, text)
+        t3 = clock()
+        timings["handler"] = t3 - t2
+    else:
+        snapshot = FAQ_KB.current()
+        idx, score = best_faq_match(msg, threshold=FAQ_THRESHOLD, snapshot=snapshot)
+        intent, reply = faq_reply(idx, score, snapshot)
+        t3 = clock()
+        timings["faq"] = t3 - t2
+    timings["total"] = t3 - t0
+    metrics.record(timings, intent, score)
+    return intent, reply, score
+
+def handle_user_message(msg, history):
+    return route_message(msg)[1]
+
 # ----------------------
-# 4) Chat UI render helpers
+# 7) Chat UI render helpers
 # ----------------------
 def render_bot_bubble(text):
     safe = text.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;").replace("\n","<br>")
@@ -180,24 +816,174 @@ def render_user_bubble(text):
     """
     return html
 
-def render_chat(history):
-    chat_html = "<div style='font-family:Arial, sans-serif; max-width:880px;'>"
-    chat_html += "<div style='padding:8px 0;color:#333;margin-bottom:8px'><b>Customer Service Chat</b></div>"
-    for turn in history:
-        if turn["role"] == "user":
-            chat_html += render_user_bubble(turn["text"])
+CHAT_OPEN = "<div style='font-family:Arial, sans-serif; max-width:880px;'>"
+CHAT_TITLE = "<div style='padding:8px 0;color:#333;margin-bottom:8px'><b>Customer Service Chat</b></div>"
+
+def render_turn(turn):
+    if turn["role"] == "user":
+        return render_user_bubble(turn["text"])
+    return render_bot_bubble(turn["text"])
+
+class ChatRenderer:
+    """Append-only chat view for an ipywidgets Output.
+
+    Each turn is rendered once and appended as its own output; the widget is
+    only cleared on reset. Past `window` outputs the oldest ones are dropped
+    from the live view (the transcript journal keeps them).
+    """
+    def __init__(self, output, window=200):
+        self.output = output
+        self.window = window
+        self.hidden = 0
+        self.reset()
+
+    def reset(self, notice=None):
+        self.hidden = 0
+        self.output.outputs = ()
+        self.output.append_display_data(HTML(CHAT_OPEN + CHAT_TITLE + "</div>"))
+        if notice:
+            self.show(notice)
+
+    def show(self, html):
+        """Append arbitrary HTML (notices, save confirmations) below the chat."""
+        self.output.append_display_data(HTML(html))
+        self._trim()
+
+    def append(self, turn):
+        metrics = METRICS
+        t = time.perf_counter() if metrics is not None else 0.0
+        self.show(CHAT_OPEN + render_turn(turn) + "</div>")
+        if metrics is not None:
+            metrics.record_stage("render", time.perf_counter() - t)
+
+    def _trim(self):
+        outputs = self.output.outputs
+        # trim in steps of window/4 so the full output list is only resent occasionally
+        if len(outputs) <= 1 + self.window + max(1, self.window // 4):
+            return
+        dropped = len(outputs) - 1 - self.window
+        self.hidden += dropped
+        note = {"output_type": "display_data", "metadata": {}, "data": {
+            "text/plain": f"{self.hidden} earlier messages hidden",
+            "text/html": CHAT_OPEN + CHAT_TITLE + f"<div style='color:#888;font-size:12px'>{self.hidden} earlier messages hidden — saved transcripts keep the full chat.</div></div>"}}
+        self.output.outputs = (note,) + tuple(outputs[-self.window:])
+
+# ----------------------
+# 8) Transcript journal (append-only JSONL) and offline HTML export
+# ----------------------
+JOURNAL_DIR = "."
+
+class TranscriptJournal:
+    """Append-only JSONL transcript, one line per turn, written as it happens.
+
+    Lines go through a buffered file that is flushed and fsynced every
+    `fsync_every` turns or `fsync_interval` seconds, whichever comes first.
+    Past `max_bytes` the file is rotated to path.1, path.2, ... like logging's
+    RotatingFileHandler (higher number = older).
+    """
+    def __init__(self, path, fsync_every=32, fsync_interval=2.0, max_bytes=16 * 1024 * 1024,
+                 backups=5, buffer_size=64 * 1024):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_size = buffer_size
+        self.lock = threading.Lock()
+        self.f = None
+        self._open()
+
+    def _open(self):
+        self.f = open(self.path, "a", encoding="utf-8", buffering=self.buffer_size)
+        self.size = os.path.getsize(self.path)
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def append(self, turn):
+        line = json.dumps(turn, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.f.write(line)
+            self.size += len(line.encode("utf-8"))
+            self.pending += 1
+            if self.pending >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+            if self.size >= self.max_bytes:
+                self._rotate()
+
+    def _sync(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def sync(self):
+        with self.lock:
+            if self.f is not None:
+                self._sync()
+
+    def _rotate(self):
+        self._sync()
+        self.f.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
         else:
-            chat_html += render_bot_bubble(turn["text"])
-    chat_html += "</div>"
-    return chat_html
+            os.remove(self.path)
+        self._open()
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self._sync()
+                self.f.close()
+                self.f = None
+
+def new_journal(name):
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    return TranscriptJournal(os.path.join(JOURNAL_DIR, f"chat_journal_{name}_{stamp}.jsonl"))
+
+def journal_segments(path):
+    """Existing files of a (possibly rotated) journal, oldest first."""
+    rotated = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        rotated.append(f"{path}.{i}")
+        i += 1
+    return rotated[::-1] + ([path] if os.path.exists(path) else [])
+
+def journal_to_html(journal_path, out_path):
+    """Convert a journal to an HTML transcript, streaming one turn at a time."""
+    with open(out_path, "w", encoding="utf-8") as out:
+        out.write("<html><body style='font-family:Arial;font-size:14px;'>" + CHAT_OPEN + CHAT_TITLE)
+        for seg in journal_segments(journal_path):
+            with open(seg, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        turn = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    out.write(render_turn(turn))
+        out.write("</div></body></html>")
+    return os.path.abspath(out_path)
+
+def transcript_name(tag=None):
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"chat_transcript_{tag}_{stamp}.html" if tag else f"chat_transcript_{stamp}.html"
 
 # ----------------------
-# 5) Main UI (ipywidgets) and handlers
+# 9) Main UI (ipywidgets) and handlers
 # ----------------------
-def run_widget_chatbot():
+def run_widget_chatbot(window=200):
     # conversation history
     history = []
     output = widgets.Output(layout={'border':'1px solid #ddd','width':'920px','height':'420px','overflow':'auto','padding':'8px'})
+    view = ChatRenderer(output, window=window)
+    FAQ_KB.start_polling()
+    journal = [new_journal("widget")]
 
     input_box = widgets.Textarea(placeholder="Type your message here...", layout=widgets.Layout(width='680px', height='80px'))
     send_btn = widgets.Button(description="Send", button_style='primary', layout=widgets.Layout(width='80px'))
@@ -206,10 +992,10 @@ def run_widget_chatbot():
     reset_btn = widgets.Button(description="Reset chat", layout=widgets.Layout(width='100px'))
 
     def append_and_render(role, text):
-        history.append({"role":role,"text":text,"ts":datetime.datetime.now().isoformat()})
-        with output:
-            clear_output(wait=True)
-            display(HTML(render_chat(history)))
+        turn = {"role":role,"text":text,"ts":datetime.datetime.now().isoformat()}
+        history.append(turn)
+        journal[0].append(turn)
+        view.append(turn)
 
     def on_send(b):
         user_text = input_box.value.strip()
@@ -231,20 +1017,15 @@ def run_widget_chatbot():
             with output:
                 print("No conversation yet to save.")
             return
-        fname = f"chat_transcript_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        html = "<html><body style='font-family:Arial;font-size:14px;'>"
-        html += render_chat(history)
-        html += "</body></html>"
-        with open(fname, "w", encoding="utf-8") as f:
-            f.write(html)
-        with output:
-            display(HTML(f"<div style='background:#e8f5e9;padding:8px;border-radius:6px;'>Saved transcript: <b>{os.path.abspath(fname)}</b></div>"))
+        journal[0].sync()
+        path = journal_to_html(journal[0].path, transcript_name())
+        view.show(f"<div style='background:#e8f5e9;padding:8px;border-radius:6px;'>Saved transcript: <b>{path}</b></div>")
 
     def on_reset(b):
         history.clear()
-        with output:
-            clear_output(wait=True)
-            display(HTML("<div style='color:#666'>Chat cleared. Start a new conversation.</div>"))
+        journal[0].close()
+        journal[0] = new_journal("widget")
+        view.reset(notice="<div style='color:#666'>Chat cleared. Start a new conversation.</div>")
 
     send_btn.on_click(on_send)
     escalate_btn.on_click(on_escalate)
@@ -259,13 +1040,17 @@ def run_widget_chatbot():
     append_and_render("bot", "Hi — I'm your virtual assistant. How can I help you today?")
 
 # ----------------------
-# 6) CLI fallback
+# 10) CLI fallback
 # ----------------------
 def run_cli_chatbot():
     print("Customer Service Chatbot (CLI mode). Type 'exit' to quit, 'save' to save transcript, 'escalate' to request human agent.")
     history = []
+    journal = new_journal("cli")
+    FAQ_KB.start_polling()
     def append(role, text):
-        history.append({"role":role,"text":text,"ts":datetime.datetime.now().isoformat()})
+        turn = {"role":role,"text":text,"ts":datetime.datetime.now().isoformat()}
+        history.append(turn)
+        journal.append(turn)
         if role == "bot":
             print("Bot:", text)
         else:
@@ -276,20 +1061,12 @@ def run_cli_chatbot():
         if not msg:
             continue
         if msg.lower() in ("exit","quit"):
+            journal.close()
             print("Goodbye.")
             break
         if msg.lower() == "save":
-            fname = f"chat_transcript_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-            html = "<html><body style='font-family:Arial,font-size:14px;'>"
-            for h in history:
-                if h["role"]=="user":
-                    html += f"<div style='text-align:right'><b>You:</b> {h['text']}</div>"
-                else:
-                    html += f"<div style='text-align:left'><b>Bot:</b> {h['text']}</div>"
-            html += "</body></html>"
-            with open(fname,"w",encoding="utf-8") as f:
-                f.write(html)
-            print("Saved to", os.path.abspath(fname))
+            journal.sync()
+            print("Saved to", journal_to_html(journal.path, transcript_name()))
             continue
         if msg.lower() == "escalate":
             append("user", msg)
@@ -300,10 +1077,416 @@ def run_cli_chatbot():
         append("bot", reply)
 
 # ----------------------
-# 7) Run appropriate interface
+# 11) Bulk ticket triage (offline replay of support emails)
+# ----------------------
+def triage_batch(messages):
+    """Route a list of messages; the FAQ fallbacks are scored together in one pass."""
+    results, pending = [], []
+    for msg in messages:
+        intent, reply = intent_reply(msg, preprocess(msg))
+        if intent is None:
+            pending.append(len(results))
+        results.append({"intent": intent, "reply": reply, "faq_score": None})
+    if pending:
+        snapshot = FAQ_KB.current()
+        matches = snapshot.index.best_matches([messages[i] for i in pending])
+        for i, (idx, score) in zip(pending, matches):
+            idx = idx if idx >= 0 and score >= FAQ_THRESHOLD else None
+            r = results[i]
+            r["intent"], r["reply"] = faq_reply(idx, score, snapshot)
+            r["faq_score"] = score
+    return results
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def triage_messages(messages, batch_size=1024):
+    """Yield one {"intent", "reply", "faq_score"} dict per message, in input order."""
+    for chunk in chunked(messages, batch_size):
+        yield from triage_batch(chunk)
+
+def read_messages(path):
+    """Yield (id, text) from a JSONL file of {"id", "text"} records or a plain one-message-per-line file."""
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip():
+                continue
+            if line.lstrip().startswith("{"):
+                rec = json.loads(line)
+                yield rec.get("id", n), rec.get("text", "")
+            else:
+                yield n, line
+
+def _triage_chunk(chunk):
+    results = triage_batch([text for _, text in chunk])
+    return [json.dumps({"id": mid, **r}, ensure_ascii=False) for (mid, _), r in zip(chunk, results)]
+
+def bounded_map(pool, fn, items, window):
+    # results come back in input order, so the output file lines up with the input;
+    # pool.map would submit the whole (possibly endless) message stream up front
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def triage_file(in_path, out_path, workers=1, batch_size=1024):
+    """Stream messages from in_path through the bot and write JSONL results to out_path."""
+    start = time.perf_counter()
+    count = 0
+    chunks = chunked(read_messages(in_path), batch_size)
+    with open(out_path, "w", encoding="utf-8") as out:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for lines in bounded_map(pool, _triage_chunk, chunks, window=2 * workers):
+                    out.write("\n".join(lines) + "\n")
+                    count += len(lines)
+        else:
+            for lines in map(_triage_chunk, chunks):
+                out.write("\n".join(lines) + "\n")
+                count += len(lines)
+    elapsed = time.perf_counter() - start
+    return {"messages": count, "seconds": round(elapsed, 3), "per_second": round(count / max(elapsed, 1e-9), 1)}
+
+# ----------------------
+# 12) Async multi-session server (local HTTP stand-in)
+# ----------------------
+def session_tag(sid):
+    # readable prefix + digest of the raw id, so ids that clean up alike ("a@b", "a_b") never share files
+    digest = hashlib.sha1(sid.encode("utf-8")).hexdigest()[:16]
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', sid)[:40] or 'session'}_{digest}"
+
+class ChatSession:
+    def __init__(self, sid, max_queue, journal):
+        self.id = sid
+        self.journal = journal
+        self.history = []
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.last_active = time.monotonic()
+        self.busy = False
+        self.worker = None
+
+class ServerBusy(Exception):
+    """Raised when a session queue or the session table is full (sent as HTTP 429/503)."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ChatServer:
+    """Hosts many concurrent chat sessions on one asyncio event loop.
+
+    Each session has its own history and a bounded queue drained by one worker
+    task, so a session's messages are answered in order. handle_user_message and
+    transcript writes run on a thread pool to keep the loop responsive.
+
+    Routes:
+      POST /sessions/<id>/messages  {"text": "..."}  -> {"session", "reply"}
+      POST /sessions/<id>/save                       -> {"session", "path"}
+      GET  /sessions/<id>                            -> {"session", "history"}
+      GET  /health                                   -> server stats
+      GET  /metrics, /metrics.json                   -> pipeline timings (when enabled)
+    """
+    def __init__(self, max_sessions=10000, max_queue=8, idle_timeout=900.0, threads=8,
+                 max_body=64 * 1024, transcript_dir="."):
+        self.sessions = {}
+        self.max_sessions = max_sessions
+        self.max_queue = max_queue
+        self.idle_timeout = idle_timeout
+        self.max_body = max_body
+        self.transcript_dir = transcript_dir
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.stats = Counter()
+
+    def session(self, sid, create=True):
+        s = self.sessions.get(sid)
+        if s is None and create:
+            if len(self.sessions) >= self.max_sessions:
+                raise ServerBusy(503, "too many active sessions")
+            # one journal per session object: a session recreated after eviction starts a new file
+            name = f"chat_journal_{session_tag(sid)}_{time.time_ns():x}.jsonl"
+            journal = TranscriptJournal(os.path.join(self.transcript_dir, name))
+            s = self.sessions[sid] = ChatSession(sid, self.max_queue, journal)
+            s.worker = asyncio.create_task(self._drain(s))
+            self.stats["sessions_opened"] += 1
+        return s
+
+    async def submit(self, sid, text):
+        """Queue a message for a session and wait for the bot's reply."""
+        s = self.session(sid)
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            s.queue.put_nowait((text, fut))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise ServerBusy(429, "session queue full, retry later")
+        s.last_active = time.monotonic()
+        return await fut
+
+    async def _drain(self, s):
+        loop = asyncio.get_running_loop()
+        while True:
+            text, fut = await s.queue.get()
+            s.busy = True
+            try:
+                user_turn = {"role":"user","text":text,"ts":datetime.datetime.now().isoformat()}
+                s.history.append(user_turn)
+                reply = await loop.run_in_executor(self.executor, handle_user_message, text, s.history)
+                bot_turn = {"role":"bot","text":reply,"ts":datetime.datetime.now().isoformat()}
+                s.history.append(bot_turn)
+                await loop.run_in_executor(self.executor, self._journal, s, user_turn, bot_turn)
+                self.stats["messages"] += 1
+                if not fut.done():
+                    fut.set_result(reply)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            finally:
+                s.busy = False
+                s.last_active = time.monotonic()
+
+    @staticmethod
+    def _journal(s, *turns):
+        for turn in turns:
+            s.journal.append(turn)
+
+    async def save(self, sid):
+        s = self.session(sid, create=False)
+        if s is None:
+            return None
+        out = os.path.join(self.transcript_dir, transcript_name(session_tag(sid)))
+        def export():
+            s.journal.sync()
+            return journal_to_html(s.journal.path, out)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, export)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        for sid, s in list(self.sessions.items()):
+            if not s.busy and s.queue.empty() and now - s.last_active > self.idle_timeout:
+                s.worker.cancel()
+                self.executor.submit(s.journal.close)
+                del self.sessions[sid]
+                self.stats["sessions_evicted"] += 1
+
+    def sync_journals(self):
+        for s in list(self.sessions.values()):
+            if s.journal.pending:
+                s.journal.sync()
+
+    async def _housekeeping(self):
+        # quiet sessions still get their buffered turns fsynced within about a second
+        loop = asyncio.get_running_loop()
+        last_evict = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            await loop.run_in_executor(self.executor, self.sync_journals)
+            if time.monotonic() - last_evict >= self.idle_timeout / 4:
+                self.evict_idle()
+                last_evict = time.monotonic()
+
+    async def dispatch(self, method, path, body):
+        parts = [p for p in path.split("?", 1)[0].split("/") if p]
+        if method == "GET" and parts == ["health"]:
+            return 200, {"sessions": len(self.sessions), **self.stats}
+        if method == "GET" and parts and parts[0] in ("metrics", "metrics.json"):
+            if METRICS is None:
+                return 404, {"error": "metrics disabled (start with --metrics or CS_METRICS=1)"}
+            return 200, METRICS.to_prometheus() if parts[0] == "metrics" else METRICS.summary()
+        if len(parts) >= 2 and parts[0] == "sessions":
+            sid = parts[1]
+            if method == "POST" and parts[2:] == ["messages"]:
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    return 400, {"error": "body must be a JSON object"}
+                text = str(payload.get("text", "")).strip()
+                if not text:
+                    return 400, {"error": "empty message"}
+                return 200, {"session": sid, "reply": await self.submit(sid, text)}
+            if method == "POST" and parts[2:] == ["save"]:
+                path = await self.save(sid)
+                return (200, {"session": sid, "path": path}) if path else (404, {"error": "unknown session"})
+            if method == "GET" and len(parts) == 2:
+                s = self.session(sid, create=False)
+                return (200, {"session": sid, "history": s.history}) if s else (404, {"error": "unknown session"})
+        return 404, {"error": "not found"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                k, _, v = line.decode("latin-1").partition(":")
+                headers[k.strip().lower()] = v.strip()
+            length = int(headers.get("content-length", 0))
+            if length > self.max_body:
+                status, payload = 413, {"error": "message too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.dispatch(method, path, body)
+        except ServerBusy as e:
+            status, payload = e.status, {"error": str(e)}
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {"error": "bad request"}
+        except Exception as e:
+            # a bug in the handler still gets a response and a closed socket
+            self.stats["errors"] += 1
+            print(f"error handling request: {e!r}", file=sys.stderr)
+            status, payload = 500, {"error": "internal error"}
+        if isinstance(payload, str):
+            data, ctype = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, ctype = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {ctype}\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n")
+        try:
+            writer.write(head.encode("latin-1") + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        housekeeping = asyncio.create_task(self._housekeeping())
+        FAQ_KB.start_polling()
+        print(f"Customer service bot listening on http://{host}:{port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            housekeeping.cancel()
+            for s in self.sessions.values():
+                s.journal.close()
+            self.executor.shutdown(wait=False)
+
+# ----------------------
+# 13) FAQ retrieval benchmark (exact vs. ANN)
+# ----------------------
+def synthetic_faq(count, vocab_size=20000, seed=3):
+    """Questions of 6-12 words drawn from a Zipf-like vocabulary, like a large ticket archive."""
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(vocab_size)]
+    cum = list(itertools.accumulate(1.0 / (i + 1) ** 0.8 for i in range(vocab_size)))
+    return [" ".join(rng.choices(vocab, cum_weights=cum, k=rng.randint(6, 12))) for _ in range(count)], vocab
+
+def benchmark_ann(entries=100_000, queries=1_000, bands=16, rows=4, seed=5):
+    """Latency of exact vs. MinHash/LSH matching and recall@1 of ANN against exact search."""
+    questions, vocab = synthetic_faq(entries)
+    rng = random.Random(seed)
+    probes = []
+    for _ in range(queries):
+        toks = rng.choice(questions).split()
+        toks.pop(rng.randrange(len(toks)))  # paraphrase: drop one word, swap another
+        toks[rng.randrange(len(toks))] = rng.choice(vocab)
+        probes.append(" ".join(toks))
+    t = time.perf_counter()
+    index = FAQIndex(questions)
+    build_index = time.perf_counter() - t
+    t = time.perf_counter()
+    ann = MinHashLSH(index, bands=bands, rows=rows)
+    build_ann = time.perf_counter() - t
+    report = {"entries": entries, "queries": queries, "bands": bands, "rows": rows,
+              "build_index_s": round(build_index, 2), "build_ann_s": round(build_ann, 2)}
+    results = {}
+    for name, matcher in (("exact", index), ("ann", ann)):
+        lat, res = [], []
+        for q in probes:
+            t = time.perf_counter()
+            res.append(matcher.best_match(q))
+            lat.append((time.perf_counter() - t) * 1e3)
+        lat.sort()
+        results[name] = res
+        report[name] = {"mean_ms": round(sum(lat) / len(lat), 3), "p50_ms": round(percentile(lat, 50), 3),
+                        "p95_ms": round(percentile(lat, 95), 3)}
+    # a different question with the same score (duplicate wording) still counts as a hit
+    hits = sum(1 for (ei, es), (ai, as_) in zip(results["exact"], results["ann"]) if ai == ei or abs(as_ - es) < 1e-9)
+    report["recall_at_1"] = round(hits / max(1, queries), 4)
+    report["mean_candidates"] = round(sum(len(ann.candidates(q)) for q in probes[:200]) / min(200, max(1, queries)), 1)
+    return report
+
+# ----------------------
+# 14) Command line tools
+# ----------------------
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(prog="customer-service-bot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("triage", help="replay a file of messages and write JSONL results")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--batch-size", type=int, default=1024)
+    p.add_argument("--faq", help="FAQ JSON/CSV file (default: CS_FAQ_PATH or the built-in list)")
+    p = sub.add_parser("export-html", help="convert a JSONL transcript journal to HTML")
+    p.add_argument("journal")
+    p.add_argument("output")
+    p = sub.add_parser("gen-orders", help="create a synthetic SQLite order database")
+    p.add_argument("path", nargs="?", default=ORDER_DB_PATH)
+    p.add_argument("--count", type=int, default=3_000_000)
+    p = sub.add_parser("bench-orders", help="measure order lookup latency")
+    p.add_argument("path", nargs="?", default=ORDER_DB_PATH)
+    p.add_argument("--queries", type=int, default=100_000)
+    p = sub.add_parser("bench-ann", help="compare exact and approximate FAQ matching")
+    p.add_argument("--entries", type=int, default=100_000)
+    p.add_argument("--queries", type=int, default=1_000)
+    p.add_argument("--bands", type=int, default=16)
+    p.add_argument("--rows", type=int, default=4)
+    p = sub.add_parser("serve", help="run the multi-session HTTP server")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--max-sessions", type=int, default=10000)
+    p.add_argument("--max-queue", type=int, default=8)
+    p.add_argument("--idle-timeout", type=float, default=900.0)
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--faq", help="FAQ JSON/CSV file, reloaded when it changes")
+    p.add_argument("--metrics", action="store_true", help="record per-stage timings, served at /metrics")
+    args = parser.parse_args(argv)
+    if getattr(args, "faq", None):
+        os.environ["CS_FAQ_PATH"] = args.faq  # so process-pool workers load the same file
+        use_faq_file(args.faq)
+    if args.command == "triage":
+        stats = triage_file(args.input, args.output, workers=args.workers, batch_size=args.batch_size)
+        print(json.dumps(stats), file=sys.stderr)
+    elif args.command == "export-html":
+        print("Saved to", journal_to_html(args.journal, args.output))
+    elif args.command == "gen-orders":
+        print(json.dumps(generate_orders(args.path, args.count)))
+    elif args.command == "bench-orders":
+        print(json.dumps(benchmark_orders(args.path, args.queries), indent=2))
+    elif args.command == "bench-ann":
+        if np is None:
+            sys.exit("bench-ann needs numpy")
+        print(json.dumps(benchmark_ann(args.entries, args.queries, args.bands, args.rows), indent=2))
+    elif args.command == "serve":
+        if args.metrics:
+            enable_metrics()
+        server = ChatServer(max_sessions=args.max_sessions, max_queue=args.max_queue,
+                            idle_timeout=args.idle_timeout, threads=args.threads)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+CLI_COMMANDS = ("triage", "export-html", "gen-orders", "bench-orders", "bench-ann", "serve")
+
+# ----------------------
+# 15) Run appropriate interface
 # ----------------------
-if HAS_WIDGETS:
-    run_widget_chatbot()
-else:
-    run_cli_chatbot()
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        run_command_line(sys.argv[1:])
+    elif HAS_WIDGETS:
+        run_widget_chatbot()
+    else:
+        run_cli_chatbot()
 # ------------------------------------